@@ -13,9 +13,11 @@ Equipo 4
 5
 """
 
+import ast
+import json
 import os
 import sys
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 import logging
 
 # Agregar el paquete al path de Python
@@ -25,6 +27,47 @@ from medical_image_manager import ImageManager, DataLoader, MedicalImage, ImageM
 from medical_image_manager.utils.validators import DataValidator
 
 
+# Tamaño a partir del cual los archivos JSON se leen en streaming (si hay ijson)
+LARGE_JSON_BYTES = 10 * 1024 * 1024
+
+# Menús fijos, construidos una sola vez y emitidos con una única escritura
+_MAIN_MENU = (
+    "\n" + "=" * 50 + "\n"
+    "            MENÚ PRINCIPAL\n"
+    + "=" * 50 + "\n"
+    "1. Registrar Nueva Imagen\n"
+    "2. Ver Imágenes Registradas\n"
+    "3. Modificar Metadatos de Imagen\n"
+    "4. Eliminar Imagen\n"
+    " extras ------\n"
+    "5. Buscar Imágenes\n"
+    "6. Cargar Dataset de Zenodo (descargar) \n"
+    "7. Salir\n"
+    + "=" * 50 + "\n"
+)
+
+_MODIFY_MENU = (
+    "\nModification options:\n"
+    "1. Add/Update metadata field\n"
+    "2. Remove metadata field\n"
+    "3. Bulk update from JSON\n"
+)
+
+_SEARCH_MENU = (
+    "\nSearch in:\n"
+    "1. All fields\n"
+    "2. Filename only\n"
+    "3. Specific metadata fields\n"
+)
+
+_DATASET_MENU = (
+    "\n--- Load Dataset ---\n"
+    "1. Download Zenodo dataset\n"
+    "2. Load from local directory\n"
+    "3. Create sample dataset\n"
+)
+
+
 class MedicalImageApp:
     """
     Aplicación de Gestión de Imágenes Médicas - Trabajo Final Grupo4
@@ -39,11 +82,14 @@ class MedicalImageApp:
         self.data_loader = DataLoader()
         self.validator = DataValidator()
         
-        # Configurar logging
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
+        # Configurar logging: solo se formatean los registros con MIM_VERBOSE
+        if os.environ.get('MIM_VERBOSE'):
+            logging.basicConfig(
+                level=logging.INFO,
+                format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+            )
+        else:
+            logging.getLogger().addHandler(logging.NullHandler())
         self.logger = logging.getLogger(__name__)
         
         print("=" * 60)
@@ -80,23 +126,12 @@ class MedicalImageApp:
         except KeyboardInterrupt:
             print("\n\nAplicación interrumpida por el usuario. ¡Hasta luego!")
         except Exception as e:
-            self.logger.error(f"Error de aplicación: {e}")
+            self.logger.error("Error de aplicación: %s", e)
             print(f"\nOcurrió un error: {e}")
     
     def display_main_menu(self) -> None:
         """Mostrar las opciones del menu principal."""
-        print("\n" + "=" * 50)
-        print("            MENÚ PRINCIPAL")
-        print("=" * 50)
-        print("1. Registrar Nueva Imagen")
-        print("2. Ver Imágenes Registradas")
-        print("3. Modificar Metadatos de Imagen")
-        print("4. Eliminar Imagen")
-        print(" extras ------")
-        print("5. Buscar Imágenes")
-        print("6. Cargar Dataset de Zenodo (descargar) ")
-        print("7. Salir")
-        print("=" * 50)
+        sys.stdout.write(_MAIN_MENU)
     
     def register_image_menu(self) -> None:
         """Manejar el registro de imágenes."""
@@ -108,7 +143,9 @@ class MedicalImageApp:
             print("La ruta del archivo no puede estar vacía.")
             return
         
-        if not os.path.exists(file_path):
+        try:
+            file_stat = os.stat(file_path)
+        except FileNotFoundError:
             print(f"Archivo no encontrado: {file_path}")
             return
         
@@ -125,7 +162,8 @@ class MedicalImageApp:
             image_id = self.image_manager.register_image(
                 file_path=file_path,
                 metadata=metadata,
-                load_pixel_data=load_pixels
+                load_pixel_data=load_pixels,
+                file_stat=file_stat
             )
             
             print(f"\n¡Imagen registrada exitosamente!")
@@ -144,16 +182,19 @@ class MedicalImageApp:
             print("No images registered.")
             return
         
-        print(f"\nFound {len(images)} registered images:\n")
-        
+        # Build the whole listing and emit it with a single write
+        lines = [f"\nFound {len(images)} registered images:\n\n"]
         for i, image in enumerate(images, 1):
-            print(f"{i}. {image.filename}")
-            print(f"   ID: {image.image_id}")
-            print(f"   Format: {image.format_type}")
-            print(f"   Size: {image.file_size or 'Unknown'} bytes")
-            print(f"   Created: {image.creation_date.strftime('%Y-%m-%d %H:%M:%S')}")
-            print(f"   Has pixel data: {'Yes' if image.pixel_data is not None else 'No'}")
-            print()
+            lines.append(
+                f"{i}. {image.filename}\n"
+                f"   ID: {image.image_id}\n"
+                f"   Format: {image.format_type}\n"
+                f"   Size: {image.file_size or 'Unknown'} bytes\n"
+                f"   Created: {image.creation_date_str}\n"
+                f"   Has pixel data: {'Yes' if image.has_pixel_data else 'No'}\n"
+                f"\n"
+            )
+        sys.stdout.write("".join(lines))
         
         # Ask if user wants to view details of a specific image
         view_details = input("View details of a specific image? (y/n): ").strip().lower() == 'y'
@@ -170,33 +211,36 @@ class MedicalImageApp:
     
     def display_image_details(self, image: MedicalImage) -> None:
         """Display detailed information about an image."""
-        print(f"\n--- Image Details: {image.filename} ---")
+        lines = [f"\n--- Image Details: {image.filename} ---\n"]
         
         info = image.get_image_info()
         
         for key, value in info.items():
             if key != 'metadata_fields':
-                print(f"{key.replace('_', ' ').title()}: {value}")
+                lines.append(f"{key.replace('_', ' ').title()}: {value}\n")
         
         # Display metadata
-        if image.metadata:
-            print("\nMetadata:")
-            for key, value in image.metadata.items():
+        metadata = image.metadata_view
+        if metadata:
+            lines.append("\nMetadata:\n")
+            for key, value in metadata.items():
                 # Truncate long values
                 str_value = str(value)
                 if len(str_value) > 100:
                     str_value = str_value[:97] + "..."
-                print(f"  {key}: {str_value}")
+                lines.append(f"  {key}: {str_value}\n")
         
         # Validation status
         is_valid = self.validator.validate_image(image)
-        print(f"\nValidation Status: {'✓ Valid' if is_valid else '✗ Invalid'}")
+        lines.append(f"\nValidation Status: {'✓ Valid' if is_valid else '✗ Invalid'}\n")
         
         if not is_valid:
             errors = self.validator.get_validation_errors(image)
-            print("Validation Errors:")
+            lines.append("Validation Errors:\n")
             for error in errors:
-                print(f"  - {error}")
+                lines.append(f"  - {error}\n")
+        
+        sys.stdout.write("".join(lines))
     
     def modify_metadata_menu(self) -> None:
         """Handle metadata modification."""
@@ -210,7 +254,7 @@ class MedicalImageApp:
         # Select image
         print("Select an image to modify:")
         for i, image in enumerate(images, 1):
-            print(f"{i}. {image.filename} (ID: {image.image_id[:8]}...)")
+            print(f"{i}. {image.filename} (ID: {image.short_id}...)")
         
         try:
             choice = int(input(f"Enter image number (1-{len(images)}): ")) - 1
@@ -221,10 +265,7 @@ class MedicalImageApp:
             selected_image = images[choice]
             
             # Modification options
-            print("\nModification options:")
-            print("1. Add/Update metadata field")
-            print("2. Remove metadata field")
-            print("3. Bulk update from JSON")
+            sys.stdout.write(_MODIFY_MENU)
             
             mod_choice = input("Select option (1-3): ").strip()
             
@@ -232,16 +273,11 @@ class MedicalImageApp:
                 key = input("Enter metadata key: ").strip()
                 value = input("Enter metadata value: ").strip()
                 
-                # Try to convert to appropriate type
+                # Try to convert to appropriate type (int, float, bool, list...)
                 try:
-                    # Try int first
-                    if value.isdigit():
-                        value = int(value)
-                    # Try float
-                    elif '.' in value and value.replace('.', '').isdigit():
-                        value = float(value)
+                    value = ast.literal_eval(value)
+                except (ValueError, SyntaxError):
                     # Keep as string otherwise
-                except:
                     pass
                 
                 success = self.image_manager.update_image_metadata(
@@ -255,9 +291,9 @@ class MedicalImageApp:
             
             elif mod_choice == '2':
                 # Show existing metadata keys
-                if selected_image.metadata:
+                if selected_image.metadata_view:
                     print("\nExisting metadata keys:")
-                    keys = list(selected_image.metadata.keys())
+                    keys = list(selected_image.metadata_view.keys())
                     for i, key in enumerate(keys, 1):
                         print(f"{i}. {key}")
                     
@@ -265,7 +301,9 @@ class MedicalImageApp:
                         key_choice = int(input(f"Select key to remove (1-{len(keys)}): ")) - 1
                         if 0 <= key_choice < len(keys):
                             key_to_remove = keys[key_choice]
-                            selected_image.remove_metadata(key_to_remove)
+                            self.image_manager.remove_image_metadata(
+                                selected_image.image_id, key_to_remove
+                            )
                             print(f"Removed metadata key: {key_to_remove}")
                         else:
                             print("Invalid key number.")
@@ -277,14 +315,12 @@ class MedicalImageApp:
             elif mod_choice == '3':
                 json_str = input("Enter JSON metadata (or file path): ").strip()
                 
-                if os.path.exists(json_str):
-                    # Read from file
-                    with open(json_str, 'r') as f:
-                        json_str = f.read()
-                
                 try:
-                    import json
-                    metadata_dict = json.loads(json_str)
+                    if os.path.exists(json_str):
+                        # Read from file
+                        metadata_dict = self.load_json_file(json_str)
+                    else:
+                        metadata_dict = json.loads(json_str)
                     
                     success = self.image_manager.update_image_metadata(
                         selected_image.image_id, metadata_dict
@@ -295,7 +331,7 @@ class MedicalImageApp:
                     else:
                         print("Failed to update metadata.")
                         
-                except json.JSONDecodeError:
+                except ValueError:
                     print("Invalid JSON format.")
             
         except ValueError:
@@ -303,6 +339,32 @@ class MedicalImageApp:
         except Exception as e:
             print(f"Error modifying metadata: {e}")
     
+    def load_json_file(self, file_path: str) -> Dict[str, Any]:
+        """
+        Load a JSON metadata file.
+        
+        Files larger than LARGE_JSON_BYTES are streamed key by key with ijson
+        when it is installed, avoiding a full in-memory copy of the raw text.
+        
+        Raises:
+            ValueError: If the file is not valid JSON
+        """
+        with open(file_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size > LARGE_JSON_BYTES:
+                try:
+                    import ijson
+                except ImportError:
+                    ijson = None
+                
+                if ijson is not None:
+                    try:
+                        return dict(ijson.kvitems(f, '', use_float=True))
+                    except ijson.JSONError as e:
+                        raise ValueError(f"Invalid JSON: {e}")
+            
+            return json.load(f)
+    
     def delete_image_menu(self) -> None:
         """Handle image deletion."""
         print("\n--- Delete Image ---")
@@ -315,7 +377,7 @@ class MedicalImageApp:
         # Select image to delete
         print("Select an image to delete:")
         for i, image in enumerate(images, 1):
-            print(f"{i}. {image.filename} (ID: {image.image_id[:8]}...)")
+            print(f"{i}. {image.filename} (ID: {image.short_id}...)")
         
         try:
             choice = int(input(f"Enter image number (1-{len(images)}): ")) - 1
@@ -354,10 +416,7 @@ class MedicalImageApp:
             return
         
         # Search options
-        print("\nSearch in:")
-        print("1. All fields")
-        print("2. Filename only")
-        print("3. Specific metadata fields")
+        sys.stdout.write(_SEARCH_MENU)
         
         search_choice = input("Select option (1-3): ").strip()
         
@@ -387,10 +446,7 @@ class MedicalImageApp:
     
     def load_dataset_menu(self) -> None:
         """Handle dataset loading."""
-        print("\n--- Load Dataset ---")
-        print("1. Download Zenodo dataset")
-        print("2. Load from local directory")
-        print("3. Create sample dataset")
+        sys.stdout.write(_DATASET_MENU)
         
         choice = input("Select option (1-3): ").strip()
         
@@ -469,19 +525,14 @@ class MedicalImageApp:
         success_count = 0
         error_count = 0
         
-        for i, file_path in enumerate(file_list, 1):
-            try:
-                print(f"Processing {i}/{len(file_list)}: {os.path.basename(file_path)}")
-                
-                image_id = self.image_manager.register_image(
-                    file_path=file_path,
-                    load_pixel_data=False  # Don't load pixel data for bulk operations
-                )
-                
+        # Pixel data is loaded lazily on first access
+        results = self.image_manager.register_images(file_list, load_pixel_data=False)
+        for i, (file_path, _, error) in enumerate(results, 1):
+            print(f"Processed {i}/{len(file_list)}: {os.path.basename(file_path)}")
+            if error is None:
                 success_count += 1
-                
-            except Exception as e:
-                print(f"  Error: {e}")
+            else:
+                print(f"  Error: {error}")
                 error_count += 1
         
         print(f"\nBulk registration complete:")
@@ -9,11 +9,17 @@ Clases:
     MedicalImage: Clase principal para representación de imágenes médicas
 """
 
-from typing import Optional, Dict, Any, Union
+from typing import Optional, Dict, Any, Union, Callable, List, Mapping
+from types import MappingProxyType
 import numpy as np
 from datetime import datetime
+import os
+import pickle
+import threading
 import uuid
 
+from ..utils.clock import cached_now
+
 
 class MedicalImage:
     """
@@ -22,24 +28,85 @@ class MedicalImage:
     Esta clase encapsula toda la información relacionada con una imagen médica,
     incluyendo datos de píxeles, metadatos e información de archivo.
     
+    Los datos de píxeles pueden cargarse de forma diferida: si se proporciona
+    un ``pixel_loader``, el array sólo se lee del disco en el primer acceso a
+    ``pixel_data`` y queda en caché a partir de ese momento.
+    
     Atributos:
         image_id (str): Identificador único para la imagen
         filename (str): Nombre de archivo original de la imagen
+        file_path (Optional[str]): Ruta al archivo de imagen en disco
         pixel_data (Optional[np.ndarray]): Array de datos de píxeles de la imagen
         metadata (Dict[str, Any]): Diccionario que contiene metadatos de la imagen
         format_type (str): Formato de imagen (ej., 'DICOM', 'NIfTI')
         creation_date (datetime): Cuándo se creó el objeto imagen
         last_modified (datetime): Cuándo se modificó la imagen por última vez
         file_size (Optional[int]): Tamaño del archivo de imagen en bytes
+        on_change (Optional[Callable[[MedicalImage], None]]): Función llamada
+            tras cada cambio de metadatos (la asigna el gestor que la registra)
     """
     
+    # Atributos fijos por instancia (sin __dict__) para reducir memoria
+    __slots__ = (
+        'image_id',
+        'filename',
+        'file_path',
+        '_pixel_data',
+        '_pixel_loader',
+        '_metadata',
+        '_metadata_blob',
+        'format_type',
+        'creation_date',
+        'last_modified',
+        'file_size',
+        '_info_cache',
+        '_info_stamp',
+        '_created_str',
+        'on_change'
+    )
+    
+    # Búfer de entropía compartido para generar identificadores en lote
+    _UUID_BUFFER_SIZE = 65536
+    _uuid_buf: bytes = b''
+    _uuid_off: int = 0
+    _uuid_pid: Optional[int] = None
+    _uuid_lock = threading.Lock()
+    
+    @classmethod
+    def _next_uuid(cls) -> str:
+        """
+        Generar un UUID versión 4 a partir de un búfer de entropía compartido.
+        
+        Se lee ``os.urandom`` en bloques de 64 KiB y se reparte en porciones de
+        16 bytes, evitando una llamada al sistema por cada imagen creada.
+        
+        Returns:
+            str: UUID aleatorio en formato canónico
+        """
+        with cls._uuid_lock:
+            # Rellenar al agotarse el búfer o tras un fork, para no repetir IDs
+            pid = os.getpid()
+            if cls._uuid_off >= len(cls._uuid_buf) or cls._uuid_pid != pid:
+                cls._uuid_buf = os.urandom(cls._UUID_BUFFER_SIZE)
+                cls._uuid_off = 0
+                cls._uuid_pid = pid
+            raw = cls._uuid_buf[cls._uuid_off:cls._uuid_off + 16]
+            cls._uuid_off += 16
+        
+        # Fijar los bits de versión (4) y variante (RFC 4122)
+        raw = (raw[:6] + bytes([(raw[6] & 0x0f) | 0x40]) + raw[7:8]
+               + bytes([(raw[8] & 0x3f) | 0x80]) + raw[9:])
+        return str(uuid.UUID(bytes=raw))
+    
     def __init__(
         self,
         filename: str,
         pixel_data: Optional[np.ndarray] = None,
         metadata: Optional[Dict[str, Any]] = None,
         format_type: str = "Desconocido",
-        file_size: Optional[int] = None
+        file_size: Optional[int] = None,
+        pixel_loader: Optional[Callable[[], np.ndarray]] = None,
+        file_path: Optional[str] = None
     ):
         """
         Inicializar una nueva instancia de MedicalImage.
@@ -50,15 +117,124 @@ class MedicalImage:
             metadata (Optional[Dict[str, Any]]): Diccionario de metadatos de la imagen
             format_type (str): Formato del archivo de imagen
             file_size (Optional[int]): Tamaño del archivo en bytes
+            pixel_loader (Optional[Callable[[], np.ndarray]]): Función que carga
+                los datos de píxeles bajo demanda
+            file_path (Optional[str]): Ruta al archivo de imagen en disco
         """
-        self.image_id: str = str(uuid.uuid4())
+        self.image_id: str = MedicalImage._next_uuid()
         self.filename: str = filename
-        self.pixel_data: Optional[np.ndarray] = pixel_data
-        self.metadata: Dict[str, Any] = metadata or {}
+        self.file_path: Optional[str] = file_path
+        self._pixel_data: Optional[np.ndarray] = pixel_data
+        self._pixel_loader: Optional[Callable[[], np.ndarray]] = pixel_loader
+        self._metadata: Optional[Dict[str, Any]] = metadata or {}
+        self._metadata_blob: Optional[bytes] = None
         self.format_type: str = format_type
-        self.creation_date: datetime = datetime.now()
-        self.last_modified: datetime = datetime.now()
+        now = cached_now()
+        self.creation_date: datetime = now
+        self.last_modified: datetime = now
         self.file_size: Optional[int] = file_size
+        
+        # Cachés de presentación (se invalidan al modificar la imagen)
+        self._info_cache: Optional[Dict[str, Any]] = None
+        self._info_stamp: Optional[tuple] = None
+        self._created_str: Optional[tuple] = None
+        
+        self.on_change: Optional[Callable[['MedicalImage'], None]] = None
+    
+    @property
+    def pixel_data(self) -> Optional[np.ndarray]:
+        """
+        Datos de píxeles de la imagen, cargados bajo demanda si es necesario.
+        
+        Returns:
+            Optional[np.ndarray]: Array de píxeles o None si no hay datos disponibles
+        """
+        if self._pixel_data is None and self._pixel_loader is not None:
+            self._pixel_data = self._pixel_loader()
+            self._pixel_loader = None
+        return self._pixel_data
+    
+    @pixel_data.setter
+    def pixel_data(self, value: Optional[np.ndarray]) -> None:
+        """Asignar los datos de píxeles descartando cualquier carga pendiente."""
+        self._pixel_data = value
+        self._pixel_loader = None
+    
+    @property
+    def has_pixel_data(self) -> bool:
+        """True si los datos de píxeles ya están cargados en memoria."""
+        return self._pixel_data is not None
+    
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """
+        Diccionario de metadatos de la imagen.
+        
+        Si los metadatos fueron compactados con ``compact_metadata`` se
+        deserializan en este acceso y permanecen en memoria como diccionario;
+        para leerlos sin expandirlos use ``read_metadata`` o ``metadata_view``.
+        
+        Returns:
+            Dict[str, Any]: Metadatos de la imagen
+        """
+        if self._metadata is None:
+            self._metadata = pickle.loads(self._metadata_blob)
+            self._metadata_blob = None
+        return self._metadata
+    
+    @metadata.setter
+    def metadata(self, value: Dict[str, Any]) -> None:
+        """Reemplazar el diccionario de metadatos."""
+        self._metadata = value
+        self._metadata_blob = None
+        self._changed()
+    
+    @property
+    def short_id(self) -> str:
+        """Prefijo de 8 caracteres del ID, usado al mostrar la imagen."""
+        return self.image_id[:8]
+    
+    @property
+    def metadata_view(self) -> Mapping[str, Any]:
+        """Vista de solo lectura de los metadatos, sin expandirlos en memoria."""
+        return MappingProxyType(self.read_metadata())
+    
+    def read_metadata(self) -> Dict[str, Any]:
+        """
+        Obtener los metadatos para solo lectura, sin expandirlos en memoria.
+        
+        Si están compactados se devuelve una copia deserializada que no se
+        conserva; si no, el propio diccionario. En ambos casos no debe
+        modificarse (use ``update_metadata``).
+        
+        Returns:
+            Dict[str, Any]: Metadatos de la imagen
+        """
+        if self._metadata is None:
+            return pickle.loads(self._metadata_blob)
+        return self._metadata
+    
+    def compact_metadata(self) -> None:
+        """
+        Serializar los metadatos a bytes para reducir la memoria residente.
+        
+        Útil para registros grandes cuyos metadatos rara vez se consultan;
+        el siguiente acceso a ``metadata`` los vuelve a expandir (las lecturas
+        con ``read_metadata`` o ``metadata_view`` no).
+        """
+        if self._metadata is not None:
+            self._metadata_blob = pickle.dumps(self._metadata, pickle.HIGHEST_PROTOCOL)
+            self._metadata = None
+    
+    @property
+    def creation_date_str(self) -> str:
+        """Fecha de creación formateada como 'YYYY-MM-DD HH:MM:SS' (cacheada)."""
+        if self._created_str is None or self._created_str[0] != self.creation_date:
+            self._created_str = (
+                self.creation_date,
+                self.creation_date.strftime('%Y-%m-%d %H:%M:%S')
+            )
+        return self._created_str[1]
     
     def update_metadata(self, key: str, value: Any) -> None:
         """
@@ -69,7 +245,17 @@ class MedicalImage:
             value (Any): Nuevo valor para el campo
         """
         self.metadata[key] = value
-        self.last_modified = datetime.now()
+        self._changed()
+    
+    def update_metadata_fields(self, updates: Dict[str, Any]) -> None:
+        """
+        Actualizar varios campos de metadatos con una sola notificación.
+        
+        Args:
+            updates (Dict[str, Any]): Campos de metadatos y sus nuevos valores
+        """
+        self.metadata.update(updates)
+        self._changed()
     
     def get_metadata(self, key: str) -> Optional[Any]:
         """
@@ -81,7 +267,7 @@ class MedicalImage:
         Returns:
             Optional[Any]: Valor de metadatos o None si la clave no existe
         """
-        return self.metadata.get(key)
+        return self.read_metadata().get(key)
     
     def remove_metadata(self, key: str) -> bool:
         """
@@ -93,19 +279,33 @@ class MedicalImage:
         Returns:
             bool: True si la clave fue eliminada, False si la clave no existía
         """
-        if key in self.metadata:
+        if key in self.read_metadata():
             del self.metadata[key]
-            self.last_modified = datetime.now()
+            self._changed()
             return True
         return False
     
+    def _changed(self) -> None:
+        """Registrar una modificación de los metadatos y avisar a ``on_change``."""
+        self.last_modified = cached_now()
+        self._info_cache = None
+        if self.on_change is not None:
+            self.on_change(self)
+    
     def get_image_info(self) -> Dict[str, Any]:
         """
         Obtener información completa sobre la imagen.
         
+        El resultado se cachea hasta que la imagen se modifica; se devuelve
+        siempre una copia para que el llamador pueda alterarla libremente.
+        
         Returns:
             Dict[str, Any]: Diccionario que contiene información de la imagen
         """
+        stamp = (self.image_id, self.creation_date, self.last_modified, self.has_pixel_data)
+        if self._info_cache is not None and self._info_stamp == stamp:
+            return self._copy_info()
+        
         info = {
             "image_id": self.image_id,
             "filename": self.filename,
@@ -113,17 +313,26 @@ class MedicalImage:
             "creation_date": self.creation_date.isoformat(),
             "last_modified": self.last_modified.isoformat(),
             "file_size": self.file_size,
-            "has_pixel_data": self.pixel_data is not None,
-            "metadata_fields": list(self.metadata.keys())
+            "has_pixel_data": self.has_pixel_data,
+            # Tupla en la caché; cada llamador recibe su propia lista
+            "metadata_fields": tuple(self.read_metadata())
         }
         
-        if self.pixel_data is not None:
+        if self.has_pixel_data:
             info.update({
-                "image_shape": self.pixel_data.shape,
-                "image_dtype": str(self.pixel_data.dtype),
-                "pixel_data_size": self.pixel_data.nbytes
+                "image_shape": self._pixel_data.shape,
+                "image_dtype": str(self._pixel_data.dtype),
+                "pixel_data_size": self._pixel_data.nbytes
             })
         
+        self._info_cache = info
+        self._info_stamp = stamp
+        return self._copy_info()
+    
+    def _copy_info(self) -> Dict[str, Any]:
+        """Copiar la información cacheada para entregarla al llamador."""
+        info = dict(self._info_cache)
+        info["metadata_fields"] = list(info["metadata_fields"])
         return info
     
     def validate_data(self) -> bool:
@@ -136,21 +345,50 @@ class MedicalImage:
         if not self.filename:
             return False
         
-        if self.pixel_data is not None:
-            if not isinstance(self.pixel_data, np.ndarray):
+        if self.has_pixel_data:
+            if not isinstance(self._pixel_data, np.ndarray):
                 return False
-            if self.pixel_data.size == 0:
+            if self._pixel_data.size == 0:
                 return False
         
         return True
     
+    @staticmethod
+    def validate_all(images: List['MedicalImage']) -> np.ndarray:
+        """
+        Validar la integridad de un lote de imágenes de forma vectorizada.
+        
+        Equivale a llamar ``validate_data`` sobre cada imagen, pero reúne los
+        indicadores en arrays booleanos y evalúa el predicado en una sola pasada.
+        
+        Args:
+            images (List[MedicalImage]): Imágenes a validar
+            
+        Returns:
+            np.ndarray: Array booleano con el resultado de cada imagen
+        """
+        count = len(images)
+        has_name = np.fromiter(
+            (bool(image.filename) for image in images), dtype=bool, count=count
+        )
+        pixels_ok = np.fromiter(
+            (
+                image._pixel_data is None
+                or (isinstance(image._pixel_data, np.ndarray) and image._pixel_data.size > 0)
+                for image in images
+            ),
+            dtype=bool,
+            count=count
+        )
+        return has_name & pixels_ok
+    
     def __str__(self) -> str:
         """Representación en cadena de la MedicalImage."""
-        return f"MedicalImage(id={self.image_id[:8]}, filename={self.filename})"
+        return f"MedicalImage(id={self.short_id}, filename={self.filename})"
     
     def __repr__(self) -> str:
         """Representación detallada en cadena de la MedicalImage."""
         return (f"MedicalImage(image_id='{self.image_id}', "
                 f"filename='{self.filename}', "
                 f"format_type='{self.format_type}', "
-                f"has_pixel_data={self.pixel_data is not None})")
\ No newline at end of file
+                f"has_pixel_data={self.has_pixel_data})")
\ No newline at end of file
@@ -8,13 +8,65 @@ Clases:
     ImageMetadata: Clase para gestión estructurada de metadatos
 """
 
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple, Iterator
 from datetime import datetime
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
+from functools import lru_cache
 import json
+import sys
 
+from ..utils.clock import cached_now
 
-@dataclass
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Las dataclasses usan __slots__ cuando la versión de Python lo permite (3.10+)
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+def _dumps(data: Dict[str, Any]) -> str:
+    """Serializa a JSON indentado, con orjson si está instalado."""
+    if orjson is not None:
+        return orjson.dumps(
+            data,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+            default=str
+        ).decode()
+    return json.dumps(data, indent=2, default=str)
+
+
+def _loads(json_str: str) -> Any:
+    """Deserializa JSON, con orjson si está instalado."""
+    if orjson is not None:
+        return orjson.loads(json_str)
+    return json.loads(json_str)
+
+
+def _parse_timestamp(value: Any) -> datetime:
+    """Convierte una marca de tiempo (epoch numérico o cadena ISO 8601) a datetime."""
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value)
+    return datetime.fromisoformat(value)
+
+
+# Modalidades aceptadas por validate_metadata
+_VALID_MODALITIES = frozenset(('CT', 'MRI', 'PET', 'SPECT', 'US', 'XR', 'MG', 'DX'))
+
+
+@lru_cache(maxsize=1024)
+def _is_iso_date(text: str) -> bool:
+    """Indica si el texto es una fecha válida en formato YYYY-MM-DD (cacheado)."""
+    try:
+        datetime.strptime(text, '%Y-%m-%d')
+    except ValueError:
+        return False
+    return True
+
+
+@dataclass(**_SLOTS)
 class PatientInfo:
     """Estructura de información del paciente para imágenes médicas."""
     patient_id: Optional[str] = None
@@ -24,7 +76,7 @@ class PatientInfo:
     patient_birth_date: Optional[str] = None
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class StudyInfo:
     """Estructura de información del estudio para imágenes médicas."""
     study_id: Optional[str] = None
@@ -35,7 +87,15 @@ class StudyInfo:
     institution_name: Optional[str] = None
 
 
-@dataclass
+# Nombres de campo precalculados (las instancias con slots no tienen __dict__);
+# las tuplas conservan el orden y los frozenset permiten comprobar pertenencia
+_PATIENT_FIELDS = tuple(f.name for f in fields(PatientInfo))
+_STUDY_FIELDS = tuple(f.name for f in fields(StudyInfo))
+_PATIENT_FIELD_SET = frozenset(_PATIENT_FIELDS)
+_STUDY_FIELD_SET = frozenset(_STUDY_FIELDS)
+
+
+@dataclass(**_SLOTS)
 class ImageMetadata:
     """
     Metadatos estructurados para imágenes médicas.
@@ -59,6 +119,10 @@ class ImageMetadata:
     created_at: datetime = field(default_factory=datetime.now)
     updated_at: datetime = field(default_factory=datetime.now)
     
+    def _touch(self) -> None:
+        """Marca los metadatos como modificados."""
+        self.updated_at = cached_now()
+    
     def update_patient_info(self, **kwargs) -> None:
         """
         Actualiza la información del paciente.
@@ -66,10 +130,11 @@ class ImageMetadata:
         Args:
             **kwargs: Campos de información del paciente a actualizar
         """
+        patient_info = self.patient_info
         for key, value in kwargs.items():
-            if hasattr(self.patient_info, key):
-                setattr(self.patient_info, key, value)
-        self.updated_at = datetime.now()
+            if key in _PATIENT_FIELD_SET:
+                setattr(patient_info, key, value)
+        self._touch()
     
     def update_study_info(self, **kwargs) -> None:
         """
@@ -78,10 +143,11 @@ class ImageMetadata:
         Args:
             **kwargs: Campos de información del estudio a actualizar
         """
+        study_info = self.study_info
         for key, value in kwargs.items():
-            if hasattr(self.study_info, key):
-                setattr(self.study_info, key, value)
-        self.updated_at = datetime.now()
+            if key in _STUDY_FIELD_SET:
+                setattr(study_info, key, value)
+        self._touch()
     
     def update_image_info(self, key: str, value: Any) -> None:
         """
@@ -92,7 +158,7 @@ class ImageMetadata:
             value (Any): Valor del campo
         """
         self.image_info[key] = value
-        self.updated_at = datetime.now()
+        self._touch()
     
     def add_custom_field(self, key: str, value: Any) -> None:
         """
@@ -103,7 +169,7 @@ class ImageMetadata:
             value (Any): Valor del campo
         """
         self.custom_fields[key] = value
-        self.updated_at = datetime.now()
+        self._touch()
     
     def remove_custom_field(self, key: str) -> bool:
         """
@@ -117,7 +183,7 @@ class ImageMetadata:
         """
         if key in self.custom_fields:
             del self.custom_fields[key]
-            self.updated_at = datetime.now()
+            self._touch()
             return True
         return False
     
@@ -129,43 +195,66 @@ class ImageMetadata:
             Dict[str, Any]: Diccionario completo de metadatos
         """
         return {
-            "patient_info": self.patient_info.__dict__,
-            "study_info": self.study_info.__dict__,
+            "patient_info": {name: getattr(self.patient_info, name) for name in _PATIENT_FIELDS},
+            "study_info": {name: getattr(self.study_info, name) for name in _STUDY_FIELDS},
             "image_info": self.image_info,
             "custom_fields": self.custom_fields,
             "created_at": self.created_at.isoformat(),
             "updated_at": self.updated_at.isoformat()
         }
     
+    def _iter_leaves(self) -> Iterator[Tuple[str, Any]]:
+        """
+        Recorre los valores escalares de los metadatos sin construir copias.
+        
+        Yields:
+            Tuple[str, Any]: Pares (ruta_campo, valor) en el mismo orden que
+            ``get_all_metadata``
+        """
+        patient_info = self.patient_info
+        for name in _PATIENT_FIELDS:
+            yield f"patient_info.{name}", getattr(patient_info, name)
+        
+        study_info = self.study_info
+        for name in _STUDY_FIELDS:
+            yield f"study_info.{name}", getattr(study_info, name)
+        
+        # Recorrido en profundidad con pila explícita (sin recursión) de los
+        # diccionarios anidados; los hijos se apilan en orden inverso para
+        # conservar el orden
+        stack = [(self.custom_fields, "custom_fields"), (self.image_info, "image_info")]
+        while stack:
+            data, path = stack.pop()
+            if isinstance(data, dict):
+                for key, value in reversed(list(data.items())):
+                    stack.append((value, f"{path}.{key}"))
+            elif isinstance(data, (list, tuple)):
+                for i in range(len(data) - 1, -1, -1):
+                    stack.append((data[i], f"{path}[{i}]"))
+            else:
+                yield path, data
+        
+        yield "created_at", self.created_at.isoformat()
+        yield "updated_at", self.updated_at.isoformat()
+    
     def search_metadata(self, query: str) -> List[tuple]:
         """
         Busca campos de metadatos que contengan una cadena de consulta.
         
+        Sólo se comparan valores escalares; los campos sin valor (None) se omiten.
+        
         Args:
             query (str): Consulta de búsqueda
             
         Returns:
             List[tuple]: Lista de tuplas (ruta_campo, valor) que coinciden con la consulta
         """
-        results = []
-        all_metadata = self.get_all_metadata()
-        
-        def search_recursive(data: Any, path: str = "") -> None:
-            if isinstance(data, dict):
-                for key, value in data.items():
-                    new_path = f"{path}.{key}" if path else key
-                    if query.lower() in str(value).lower():
-                        results.append((new_path, value))
-                    search_recursive(value, new_path)
-            elif isinstance(data, (list, tuple)):
-                for i, item in enumerate(data):
-                    new_path = f"{path}[{i}]"
-                    search_recursive(item, new_path)
-            elif query.lower() in str(data).lower():
-                results.append((path, data))
-        
-        search_recursive(all_metadata)
-        return results
+        query_lower = query.lower()
+        return [
+            (path, value) for path, value in self._iter_leaves()
+            if value is not None
+            and query_lower in (value if isinstance(value, str) else str(value)).lower()
+        ]
     
     def validate_metadata(self) -> List[str]:
         """
@@ -181,16 +270,13 @@ class ImageMetadata:
             errors.append("El ID del paciente es requerido")
         
         # Verificar modalidad válida
-        valid_modalities = ['CT', 'MRI', 'PET', 'SPECT', 'US', 'XR', 'MG', 'DX']
         if (self.study_info.modality and 
-            self.study_info.modality not in valid_modalities):
+            self.study_info.modality not in _VALID_MODALITIES):
             errors.append(f"Modalidad inválida: {self.study_info.modality}")
         
         # Verificar formatos de fecha
         if self.patient_info.patient_birth_date:
-            try:
-                datetime.strptime(self.patient_info.patient_birth_date, '%Y-%m-%d')
-            except ValueError:
+            if not _is_iso_date(self.patient_info.patient_birth_date):
                 errors.append("La fecha de nacimiento del paciente debe estar en formato YYYY-MM-DD")
         
         return errors
@@ -202,7 +288,7 @@ class ImageMetadata:
         Returns:
             str: Representación JSON de los metadatos
         """
-        return json.dumps(self.get_all_metadata(), indent=2, default=str)
+        return _dumps(self.get_all_metadata())
     
     @classmethod
     def from_json(cls, json_str: str) -> 'ImageMetadata':
@@ -215,33 +301,32 @@ class ImageMetadata:
         Returns:
             ImageMetadata: Nueva instancia con metadatos cargados
         """
-        data = json.loads(json_str)
-        
-        metadata = cls()
-        
-        # Cargar información del paciente
-        if 'patient_info' in data:
-            for key, value in data['patient_info'].items():
-                if hasattr(metadata.patient_info, key):
-                    setattr(metadata.patient_info, key, value)
-        
-        # Cargar información del estudio
-        if 'study_info' in data:
-            for key, value in data['study_info'].items():
-                if hasattr(metadata.study_info, key):
-                    setattr(metadata.study_info, key, value)
+        data = _loads(json_str)
         
-        # Cargar información de imagen y campos personalizados
-        metadata.image_info = data.get('image_info', {})
-        metadata.custom_fields = data.get('custom_fields', {})
+        # Filtrar campos conocidos y construir cada dataclass en una sola llamada
+        patient_info = PatientInfo(**{
+            key: value for key, value in data.get('patient_info', {}).items()
+            if key in _PATIENT_FIELD_SET
+        })
+        study_info = StudyInfo(**{
+            key: value for key, value in data.get('study_info', {}).items()
+            if key in _STUDY_FIELD_SET
+        })
         
         # Cargar marcas de tiempo
+        timestamps = {}
         if 'created_at' in data:
-            metadata.created_at = datetime.fromisoformat(data['created_at'])
+            timestamps['created_at'] = _parse_timestamp(data['created_at'])
         if 'updated_at' in data:
-            metadata.updated_at = datetime.fromisoformat(data['updated_at'])
+            timestamps['updated_at'] = _parse_timestamp(data['updated_at'])
         
-        return metadata
+        return cls(
+            patient_info=patient_info,
+            study_info=study_info,
+            image_info=data.get('image_info', {}),
+            custom_fields=data.get('custom_fields', {}),
+            **timestamps
+        )
     
     def __str__(self) -> str:
         """Representación en cadena de ImageMetadata."""
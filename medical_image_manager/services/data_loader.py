@@ -10,16 +10,122 @@ Clases:
 """
 
 import os
+import gzip
+import importlib.util
+import json
+import shutil
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import zipfile
 import tempfile
-from typing import List, Optional, Dict, Any
+import time
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import List, Optional, Dict, Any, Tuple, Iterator
 import logging
-from pathlib import Path
 
 from ..models.medical_image import MedicalImage
 from ..utils.file_handler import FileHandler
 
+# Tamaño de bloque de descarga y frecuencia mínima (segundos) de los avisos de progreso
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+PROGRESS_LOG_INTERVAL = 2.0
+
+# Descargas simultáneas máximas de un mismo registro de Zenodo
+MAX_DOWNLOAD_WORKERS = 8
+
+# Validez (segundos) de la información de registros de Zenodo cacheada
+RECORD_CACHE_TTL = 3600
+
+# Número de archivos a partir del cual la lectura de series DICOM usa varios procesos
+PARALLEL_DICOM_THRESHOLD = 64
+
+
+def _iter_files(root: str, recursive: bool = True) -> Iterator[os.DirEntry]:
+    """
+    Recorre un directorio con os.scandir y una pila explícita.
+    
+    DirEntry guarda el tipo de archivo leído del directorio, por lo que no hace
+    falta un stat por entrada. Los enlaces simbólicos a directorios no se siguen.
+    
+    Args:
+        root (str): Directorio raíz
+        recursive (bool): Si descender a subdirectorios
+        
+    Yields:
+        os.DirEntry: Entradas de archivos regulares
+    """
+    pending = [root]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        pending.append(entry.path)
+                elif entry.is_file():
+                    yield entry
+
+
+def _probe_dicom(file_path: str) -> Optional[int]:
+    """
+    Lee la cabecera de un archivo DICOM una sola vez.
+    
+    Args:
+        file_path (str): Ruta del archivo a comprobar
+        
+    Returns:
+        Optional[int]: InstanceNumber (0 si falta), o None si no es DICOM
+    """
+    # Descartar archivos sin preámbulo DICOM (128 bytes + 'DICM') sin analizarlos;
+    # dcmread sin force=True también los rechazaría
+    try:
+        with open(file_path, 'rb') as f:
+            if f.read(132)[128:] != b'DICM':
+                return None
+    except OSError:
+        return None
+    
+    import pydicom
+    
+    try:
+        ds = pydicom.dcmread(
+            file_path,
+            stop_before_pixels=True,
+            specific_tags=['InstanceNumber', 'SOPClassUID']
+        )
+    except Exception:
+        return None
+    
+    try:
+        return int(getattr(ds, 'InstanceNumber', 0) or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+# Número de archivos a partir del cual validate_dataset usa varios procesos, y
+# máximo de procesos (más allá la lectura de cabeceras queda limitada por E/S)
+PARALLEL_VALIDATION_THRESHOLD = 64
+MAX_VALIDATION_WORKERS = 8
+
+
+def _validate_one(file_path: str) -> Tuple[str, Optional[str], Optional[str]]:
+    """
+    Carga los metadatos de un archivo para validar el conjunto de datos.
+    
+    Args:
+        file_path (str): Ruta del archivo a validar
+        
+    Returns:
+        Tuple[str, Optional[str], Optional[str]]: (ruta, formato, error); el
+        formato es None si hubo error y el error es None si la carga fue correcta
+    """
+    try:
+        _, _, format_type = FileHandler().load_image(file_path, load_pixel_data=False)
+        return file_path, format_type, None
+    except Exception as e:
+        return file_path, None, str(e)
+
 
 class DataLoader:
     """
@@ -32,8 +138,12 @@ class DataLoader:
         file_handler (FileHandler): Manejador para operaciones de archivo
         logger (logging.Logger): Instancia del logger
         download_dir (str): Directorio para archivos descargados
+        session (requests.Session): Sesión HTTP compartida por las descargas
     """
     
+    # Caché en proceso de registros de Zenodo: record_id -> (instante, datos)
+    _record_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+    
     def __init__(self, download_dir: str = "data/downloads"):
         """
         Inicializa el DataLoader.
@@ -45,6 +155,20 @@ class DataLoader:
         self.logger = logging.getLogger(__name__)
         self.download_dir = download_dir
         
+        # Sesión HTTP compartida: reutiliza conexiones TLS y reintenta errores transitorios
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=MAX_DOWNLOAD_WORKERS,
+            pool_maxsize=MAX_DOWNLOAD_WORKERS,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504]
+            )
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
         # Asegurar que el directorio de descarga existe
         os.makedirs(download_dir, exist_ok=True)
     
@@ -66,15 +190,9 @@ class DataLoader:
         Raises:
             requests.RequestException: If download fails
         """
-        zenodo_url = f"https://zenodo.org/api/records/{record_id}"
-        
         try:
             # Get record information
-            self.logger.info(f"Fetching Zenodo record information: {record_id}")
-            response = requests.get(zenodo_url)
-            response.raise_for_status()
-            
-            record_data = response.json()
+            record_data = self._fetch_record(record_id)
             files = record_data.get('files', [])
             
             if not files:
@@ -84,25 +202,32 @@ class DataLoader:
             download_path = os.path.join(self.download_dir, f"zenodo_{record_id}")
             os.makedirs(download_path, exist_ok=True)
             
-            downloaded_files = []
-            for file_info in files:
-                file_url = file_info['links']['self']
-                filename = file_info['key']
-                file_path = os.path.join(download_path, filename)
-                
-                self.logger.info(f"Downloading: {filename}")
+            tasks = [
+                (file_info['links']['self'], os.path.join(download_path, file_info['key']))
+                for file_info in files
+            ]
+            
+            def download(task):
+                file_url, file_path = task
+                self.logger.info("Downloading: %s", os.path.basename(file_path))
                 self._download_file(file_url, file_path)
-                downloaded_files.append(file_path)
-                
-                # Extract if it's an archive
-                if extract and filename.endswith(('.zip', '.tar.gz', '.tar')):
-                    self._extract_archive(file_path, download_path)
+                return file_path
+            
+            # Las descargas son de E/S de red: se ejecutan en paralelo con hilos
+            with ThreadPoolExecutor(max_workers=min(MAX_DOWNLOAD_WORKERS, len(tasks))) as executor:
+                downloaded_files = list(executor.map(download, tasks))
             
-            self.logger.info(f"Dataset downloaded to: {download_path}")
+            # Extract archives once every download has finished
+            if extract:
+                for file_path in downloaded_files:
+                    if file_path.endswith(('.zip', '.tar.gz', '.tar')):
+                        self._extract_archive(file_path, download_path)
+            
+            self.logger.info("Dataset downloaded to: %s", download_path)
             return download_path
             
         except Exception as e:
-            self.logger.error(f"Failed to download Zenodo dataset: {e}")
+            self.logger.error("Failed to download Zenodo dataset: %s", e)
             raise
     
     def load_from_directory(
@@ -126,27 +251,19 @@ class DataLoader:
             supported_formats = ['.dcm', '.nii', '.nii.gz', '.img', '.hdr']
         
         image_files = []
-        directory_path = Path(directory_path)
         
-        if not directory_path.exists():
-            self.logger.warning(f"Directory does not exist: {directory_path}")
+        if not os.path.isdir(directory_path):
+            self.logger.warning("Directory does not exist: %s", directory_path)
             return image_files
         
-        # Search for image files
-        if recursive:
-            pattern = "**/*"
-        else:
-            pattern = "*"
+        # Lowercased extensions, matched in one str.endswith call per file
+        extensions = tuple(ext.lower() for ext in supported_formats)
         
-        for file_path in directory_path.glob(pattern):
-            if file_path.is_file():
-                # Check if file extension is supported
-                for ext in supported_formats:
-                    if file_path.name.lower().endswith(ext.lower()):
-                        image_files.append(str(file_path))
-                        break
+        for entry in _iter_files(str(directory_path), recursive):
+            if entry.name.lower().endswith(extensions):
+                image_files.append(entry.path)
         
-        self.logger.info(f"Found {len(image_files)} image files in {directory_path}")
+        self.logger.info("Found %s image files in %s", len(image_files), directory_path)
         return image_files
     
     def load_dicom_series(
@@ -162,43 +279,32 @@ class DataLoader:
         Returns:
             List[str]: List of DICOM file paths in series order
         """
-        dicom_files = []
-        
-        try:
-            import pydicom
-            
-            # Find all DICOM files
-            for root, dirs, files in os.walk(series_directory):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    try:
-                        # Try to read as DICOM
-                        pydicom.dcmread(file_path, stop_before_pixels=True)
-                        dicom_files.append(file_path)
-                    except:
-                        # Not a DICOM file, skip
-                        continue
-            
-            # Sort DICOM files by instance number if available
-            def get_instance_number(file_path):
-                try:
-                    ds = pydicom.dcmread(file_path, stop_before_pixels=True)
-                    return getattr(ds, 'InstanceNumber', 0)
-                except:
-                    return 0
-            
-            dicom_files.sort(key=get_instance_number)
-            
-        except ImportError:
+        # Comprobar que pydicom está disponible antes de recorrer la serie
+        if importlib.util.find_spec("pydicom") is None:
             self.logger.warning("pydicom not available, using file-based discovery")
             # Fallback to file extension search
-            dicom_files = self.load_from_directory(
+            return self.load_from_directory(
                 series_directory, 
                 recursive=True, 
                 supported_formats=['.dcm', '.dicom']
             )
         
-        return dicom_files
+        candidates = [entry.path for entry in _iter_files(series_directory)]
+        
+        # Leer cada cabecera una sola vez (en paralelo si la serie es grande)
+        if len(candidates) >= PARALLEL_DICOM_THRESHOLD:
+            with ProcessPoolExecutor() as executor:
+                instance_numbers = list(executor.map(_probe_dicom, candidates, chunksize=64))
+        else:
+            instance_numbers = [_probe_dicom(path) for path in candidates]
+        
+        # Descartar archivos no DICOM y ordenar por número de instancia
+        series = [
+            (number, path) for path, number in zip(candidates, instance_numbers)
+            if number is not None
+        ]
+        series.sort(key=itemgetter(0))
+        return [path for _, path in series]
     
     def validate_dataset(
         self,
@@ -221,19 +327,21 @@ class DataLoader:
             "errors": []
         }
         
-        for file_path in file_paths:
-            try:
-                # Try to load image metadata
-                _, metadata, format_type = self.file_handler.load_image(
-                    file_path, load_pixel_data=False
-                )
-                
+        # Header parsing is CPU-bound: spread large datasets across processes
+        if len(file_paths) >= PARALLEL_VALIDATION_THRESHOLD:
+            workers = min(os.cpu_count() or 1, MAX_VALIDATION_WORKERS)
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                outcomes = list(executor.map(_validate_one, file_paths, chunksize=32))
+        else:
+            outcomes = [_validate_one(file_path) for file_path in file_paths]
+        
+        for file_path, format_type, error in outcomes:
+            if error is None:
                 results["valid_files"] += 1
                 results["formats"][format_type] = results["formats"].get(format_type, 0) + 1
-                
-            except Exception as e:
+            else:
                 results["invalid_files"] += 1
-                results["errors"].append(f"{file_path}: {str(e)}")
+                results["errors"].append(f"{file_path}: {error}")
         
         return results
     
@@ -257,31 +365,82 @@ class DataLoader:
         os.makedirs(output_dir, exist_ok=True)
         sample_files = []
         
+        # Save as NIfTI format (requires nibabel)
+        try:
+            import nibabel as nib
+        except ImportError:
+            self.logger.warning("nibabel not available, skipping NIfTI sample creation")
+            return sample_files
+        
+        # Create all synthetic 3D volumes in a single PCG64 draw
+        rng = np.random.default_rng()
+        block = rng.integers(0, 4096, size=(num_samples, 64, 64, 32), dtype=np.uint16)
+        affine = np.eye(4)
+        
         for i in range(num_samples):
-            # Create synthetic 3D image data
-            image_data = np.random.randint(0, 4096, size=(64, 64, 32), dtype=np.uint16)
+            # Create NIfTI image
+            nii_img = nib.Nifti1Image(block[i], affine=affine)
+            
+            # Save to file; random data barely compresses, so use the fastest gzip level
+            filename = f"sample_{i:03d}.nii.gz"
+            file_path = os.path.join(output_dir, filename)
+            with gzip.open(file_path, 'wb', compresslevel=1) as f:
+                f.write(nii_img.to_bytes())
             
-            # Save as NIfTI format (requires nibabel)
-            try:
-                import nibabel as nib
-                
-                # Create NIfTI image
-                nii_img = nib.Nifti1Image(image_data, affine=np.eye(4))
-                
-                # Save to file
-                filename = f"sample_{i:03d}.nii.gz"
-                file_path = os.path.join(output_dir, filename)
-                nib.save(nii_img, file_path)
-                
-                sample_files.append(file_path)
-                
-            except ImportError:
-                self.logger.warning("nibabel not available, skipping NIfTI sample creation")
-                break
-        
-        self.logger.info(f"Created {len(sample_files)} sample files in {output_dir}")
+            sample_files.append(file_path)
+        
+        self.logger.info("Created %s sample files in %s", len(sample_files), output_dir)
         return sample_files
     
+    def _fetch_record(self, record_id: str, ttl: float = RECORD_CACHE_TTL) -> Dict[str, Any]:
+        """
+        Obtiene la información de un registro de Zenodo, usando caché si es reciente.
+        
+        Se consulta primero la caché en memoria y después una copia en disco en
+        ``download_dir/.zenodo_cache``; sólo si ambas han expirado se accede a la red.
+        
+        Args:
+            record_id (str): Zenodo record ID
+            ttl (float): Segundos durante los que la caché se considera válida
+            
+        Returns:
+            Dict[str, Any]: JSON del registro
+            
+        Raises:
+            requests.RequestException: Si la consulta falla
+        """
+        now = time.time()
+        cached = self._record_cache.get(record_id)
+        if cached is not None and now - cached[0] < ttl:
+            return cached[1]
+        
+        cache_dir = os.path.join(self.download_dir, '.zenodo_cache')
+        cache_file = os.path.join(cache_dir, f"{record_id}.json")
+        try:
+            fetched_at = os.path.getmtime(cache_file)
+            if now - fetched_at < ttl:
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    record_data = json.load(f)
+                self._record_cache[record_id] = (fetched_at, record_data)
+                return record_data
+        except (OSError, ValueError):
+            pass
+        
+        self.logger.info("Fetching Zenodo record information: %s", record_id)
+        response = self.session.get(f"https://zenodo.org/api/records/{record_id}")
+        response.raise_for_status()
+        record_data = response.json()
+        
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(cache_file, 'w', encoding='utf-8') as f:
+                json.dump(record_data, f)
+        except OSError as e:
+            self.logger.warning("Could not cache Zenodo record %s: %s", record_id, e)
+        
+        self._record_cache[record_id] = (now, record_data)
+        return record_data
+    
     def _download_file(self, url: str, file_path: str) -> None:
         """
         Download a file from URL to local path.
@@ -290,23 +449,26 @@ class DataLoader:
             url (str): URL to download from
             file_path (str): Local path to save file
         """
-        response = requests.get(url, stream=True)
+        response = self.session.get(url, stream=True)
         response.raise_for_status()
         
         total_size = int(response.headers.get('content-length', 0))
         downloaded_size = 0
+        last_report = time.monotonic()
         
         with open(file_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
                 if chunk:
                     f.write(chunk)
                     downloaded_size += len(chunk)
                     
-                    # Simple progress indication
+                    # Progress indication, at most every PROGRESS_LOG_INTERVAL seconds
                     if total_size > 0:
-                        progress = (downloaded_size / total_size) * 100
-                        if downloaded_size % (1024 * 1024) == 0:  # Every MB
-                            self.logger.info(f"Download progress: {progress:.1f}%")
+                        now = time.monotonic()
+                        if now - last_report >= PROGRESS_LOG_INTERVAL:
+                            last_report = now
+                            progress = (downloaded_size / total_size) * 100
+                            self.logger.info("Download progress: %.1f%%", progress)
     
     def _extract_archive(self, archive_path: str, extract_dir: str) -> None:
         """
@@ -316,19 +478,42 @@ class DataLoader:
             archive_path (str): Path to archive file
             extract_dir (str): Directory to extract to
         """
+        # Marker written after a complete extraction so it is not repeated
+        done_marker = f"{archive_path}.extracted"
+        if os.path.exists(done_marker):
+            self.logger.info("Already extracted: %s", archive_path)
+            return
+        
         try:
             if archive_path.endswith('.zip'):
+                root = os.path.realpath(extract_dir)
                 with zipfile.ZipFile(archive_path, 'r') as zip_ref:
-                    zip_ref.extractall(extract_dir)
+                    for member in zip_ref.infolist():
+                        target = os.path.realpath(os.path.join(root, member.filename))
+                        # Skip members that would escape the extraction directory
+                        if not target.startswith(root + os.sep):
+                            self.logger.warning("Skipping unsafe archive member: %s", member.filename)
+                            continue
+                        if member.is_dir():
+                            os.makedirs(target, exist_ok=True)
+                            continue
+                        os.makedirs(os.path.dirname(target), exist_ok=True)
+                        with zip_ref.open(member) as src, open(target, 'wb') as dst:
+                            shutil.copyfileobj(src, dst, 1024 * 1024)
             elif archive_path.endswith(('.tar.gz', '.tar')):
                 import tarfile
-                with tarfile.open(archive_path, 'r') as tar_ref:
+                # Explicit mode avoids probing every compression format
+                mode = 'r:gz' if archive_path.endswith('.tar.gz') else 'r:'
+                with tarfile.open(archive_path, mode) as tar_ref:
                     tar_ref.extractall(extract_dir)
             
-            self.logger.info(f"Extracted: {archive_path}")
+            with open(done_marker, 'w'):
+                pass
+            
+            self.logger.info("Extracted: %s", archive_path)
             
         except Exception as e:
-            self.logger.error(f"Failed to extract {archive_path}: {e}")
+            self.logger.error("Failed to extract %s: %s", archive_path, e)
     
     def get_download_info(self, record_id: str = "7105232") -> Dict[str, Any]:
         """
@@ -340,13 +525,8 @@ class DataLoader:
         Returns:
             Dict[str, Any]: Dataset information
         """
-        zenodo_url = f"https://zenodo.org/api/records/{record_id}"
-        
         try:
-            response = requests.get(zenodo_url)
-            response.raise_for_status()
-            
-            record_data = response.json()
+            record_data = self._fetch_record(record_id)
             
             info = {
                 "record_id": record_id,
@@ -366,5 +546,5 @@ class DataLoader:
             return info
             
         except Exception as e:
-            self.logger.error(f"Failed to get dataset info: {e}")
+            self.logger.error("Failed to get dataset info: %s", e)
             return {"error": str(e)}
\ No newline at end of file
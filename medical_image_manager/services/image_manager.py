@@ -9,17 +9,151 @@ Clases:
     ImageManager: Clase de servicio principal para operaciones de gestión de imágenes
 """
 
-from typing import Dict, List, Optional, Any, Union
+from typing import Callable, Dict, List, Optional, Any, Union, Set, Iterable, Iterator, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import suppress
 import os
 import json
 import pickle
+import threading
 from datetime import datetime
 import logging
 
+import numpy as np
+
 from ..models.medical_image import MedicalImage
 from ..models.metadata import ImageMetadata
 from ..utils.file_handler import FileHandler
 from ..utils.validators import DataValidator
+from .image_store import ImageStore
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Codificador compartido para el caso sin orjson (evita crear uno por llamada)
+_JSON_ENCODER = json.JSONEncoder(separators=(',', ':'), default=str)
+
+
+def _json_bytes(data: Any) -> bytes:
+    """Serializa a JSON compacto en bytes, con orjson si está instalado."""
+    if orjson is not None:
+        return orjson.dumps(
+            data,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+            default=str
+        )
+    return _JSON_ENCODER.encode(data).encode()
+
+
+def _json_load(data: bytes) -> Any:
+    """Deserializa JSON desde bytes, con orjson si está instalado."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# Hilos para leer los archivos de metadatos al arrancar
+_LOAD_WORKERS = 32
+
+# Campos por los que list_images puede ordenar
+_SORT_KEYS = frozenset(("creation_date", "filename", "last_modified", "file_size"))
+
+
+def _read_json_file(path: str) -> Tuple[Any, Optional[Exception]]:
+    """Lee un archivo JSON, devolviendo el error en lugar de lanzarlo."""
+    try:
+        with open(path, 'rb') as f:
+            return _json_load(f.read()), None
+    except Exception as e:
+        return None, e
+
+
+def _remove_file(path: str) -> None:
+    """Elimina un archivo si existe, sin una comprobación previa."""
+    with suppress(FileNotFoundError):
+        os.unlink(path)
+
+
+def _char_bloom(text: str) -> int:
+    """Calcula un filtro de Bloom de 64 bits con los caracteres de un texto."""
+    bloom = 0
+    for char in set(text):
+        bloom |= 1 << (ord(char) & 63)
+    return bloom
+
+
+def _trigrams(text: str) -> Set[str]:
+    """
+    Obtiene los fragmentos de 3 caracteres (trigramas) de un texto.
+    
+    Los textos de 1 o 2 caracteres se devuelven completos, de modo que toda
+    subcadena de hasta 3 caracteres aparece dentro de alguna clave del índice.
+    """
+    if len(text) < 3:
+        return {text} if text else set()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class _ImageRegistry(dict):
+    """
+    Registro de imágenes (ID -> MedicalImage) con contador de versión.
+    
+    Toda modificación, también las hechas directamente sobre
+    ``ImageManager.images``, incrementa ``version``. Las imágenes registradas
+    reciben ``on_change`` para avisar de los cambios de sus metadatos.
+    """
+    
+    def __init__(self, on_change: Callable[[MedicalImage], None]):
+        super().__init__()
+        self.version = 0
+        self._on_change = on_change
+    
+    def _detach(self, image: MedicalImage) -> None:
+        """Retira el aviso de cambios de una imagen que sale del registro."""
+        if image.on_change == self._on_change:
+            image.on_change = None
+    
+    def __setitem__(self, image_id: str, image: MedicalImage) -> None:
+        previous = self.get(image_id)
+        if previous is not None and previous is not image:
+            self._detach(previous)
+        super().__setitem__(image_id, image)
+        image.on_change = self._on_change
+        self.version += 1
+    
+    def __delitem__(self, image_id: str) -> None:
+        self.pop(image_id)
+    
+    def pop(self, image_id: str, *default: Any) -> Any:
+        if image_id not in self:
+            return super().pop(image_id, *default)
+        image = super().pop(image_id)
+        self._detach(image)
+        self.version += 1
+        return image
+    
+    def popitem(self) -> Tuple[str, MedicalImage]:
+        image_id, image = super().popitem()
+        self._detach(image)
+        self.version += 1
+        return image_id, image
+    
+    def clear(self) -> None:
+        for image in self.values():
+            self._detach(image)
+        super().clear()
+        self.version += 1
+    
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        for image_id, image in dict(*args, **kwargs).items():
+            self[image_id] = image
+    
+    def setdefault(self, image_id: str, image: Optional[MedicalImage] = None) -> MedicalImage:
+        if image_id not in self:
+            self[image_id] = image
+        return self[image_id]
 
 
 class ImageManager:
@@ -34,28 +168,70 @@ class ImageManager:
         storage_path (str): Ruta para almacenamiento persistente
         file_handler (FileHandler): Manejador para operaciones de archivo
         validator (DataValidator): Utilidades de validación de datos
+        store (Optional[ImageStore]): Catálogo SQLite opcional con índice FTS5
         logger (logging.Logger): Instancia del logger
     """
     
-    def __init__(self, storage_path: str = "data/images"):
+    def __init__(self, storage_path: str = "data/images", use_database: bool = False):
         """
         Inicializa el ImageManager.
         
         Args:
             storage_path (str): Ruta para almacenar datos de imagen y metadatos
+            use_database (bool): Si mantener además un catálogo SQLite
+                (``images.db``) para arranques rápidos y búsquedas con FTS5
         """
-        self.images: Dict[str, MedicalImage] = {}
+        self.images: Dict[str, MedicalImage] = _ImageRegistry(self._image_changed)
         self.storage_path: str = storage_path
+        
+        # Índice invertido de trigramas (trigrama -> IDs de imagen) para búsquedas
+        self._trigram_index: Dict[str, Set[str]] = {}
+        self._image_trigrams: Dict[str, Set[str]] = {}
+        
+        # Textos de metadatos ya en minúsculas por imagen: (todos los valores
+        # unidos, {campo: valor} de los valores no vacíos) para verificar búsquedas
+        self._search_text: Dict[str, Tuple[str, Dict[str, str]]] = {}
+        
+        # Índice por campo: campo -> valor en minúsculas -> IDs de imagen, para
+        # búsquedas restringidas a campos sin recorrer todas las imágenes
+        self._field_index: Dict[str, Dict[str, Set[str]]] = {}
+        
+        # Filtro de Bloom de 64 bits de los caracteres de cada imagen, para
+        # descartar en O(1) las que no pueden contener una consulta no indexada
+        self._char_blooms: Dict[str, int] = {}
+        
+        # Imágenes modificadas cuyo registro en el catálogo SQLite aún no se ha
+        # actualizado; se añaden siempre a los candidatos del catálogo
+        self._store_stale: Set[str] = set()
+        
+        # Columnas paralelas (structure-of-arrays) para listar y ordenar sin
+        # recorrer los objetos; se reconstruyen cuando cambia la versión del registro
+        self._columns: Optional[Dict[str, np.ndarray]] = None
+        self._columns_version = -1
+        
+        # Identidad de archivo (dev, inode, tamaño, mtime) -> ID de imagen, para
+        # no volver a leer un archivo sin cambios ya registrado
+        self._by_stat: Dict[tuple, str] = {}
+        self._stat_by_id: Dict[str, tuple] = {}
+        
+        # Identidades de archivo que se están registrando ahora -> aviso de fin
+        self._registering: Dict[tuple, threading.Event] = {}
+        
+        # Protege el registro y el índice cuando se registran imágenes en paralelo
+        self._lock = threading.RLock()
         self.file_handler = FileHandler()
         self.validator = DataValidator()
         
-        # Configurar logging
-        logging.basicConfig(level=logging.INFO)
+        # Configurar logging (la configuración global corresponde a la aplicación)
         self.logger = logging.getLogger(__name__)
         
         # Asegurar que el directorio de almacenamiento existe
         os.makedirs(storage_path, exist_ok=True)
         
+        self.store: Optional[ImageStore] = None
+        if use_database:
+            self.store = ImageStore(os.path.join(storage_path, "images.db"))
+        
         # Cargar imágenes existentes desde el almacenamiento
         self._load_existing_images()
     
@@ -63,15 +239,25 @@ class ImageManager:
         self,
         file_path: str,
         metadata: Optional[ImageMetadata] = None,
-        load_pixel_data: bool = True
+        load_pixel_data: bool = True,
+        file_stat: Optional[os.stat_result] = None
     ) -> str:
         """
         Registra una nueva imagen médica en el sistema.
         
+        Puede invocarse desde varios hilos a la vez; la actualización del
+        registro y del índice de búsqueda se realiza bajo un lock. Si el mismo
+        archivo ya está registrado y no ha cambiado (mismo inode, tamaño y
+        fecha de modificación), no se pasan metadatos y no se han modificado
+        los de la imagen registrada, se devuelve su ID sin volver a leerlo;
+        esto incluye los registros simultáneos del mismo archivo.
+        
         Args:
             file_path (str): Ruta al archivo de imagen
             metadata (Optional[ImageMetadata]): Metadatos de la imagen
             load_pixel_data (bool): Si cargar datos de píxeles en memoria
+            file_stat (Optional[os.stat_result]): Resultado de ``os.stat`` si el
+                llamador ya lo obtuvo, para no repetir la llamada
             
         Returns:
             str: ID único de imagen para la imagen registrada
@@ -80,9 +266,49 @@ class ImageManager:
             FileNotFoundError: Si el archivo de imagen no existe
             ValueError: Si el formato de imagen no es soportado
         """
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"Image file not found: {file_path}")
-        
+        # Un único stat comprueba la existencia y obtiene tamaño e identidad
+        if file_stat is None:
+            try:
+                file_stat = os.stat(file_path)
+            except FileNotFoundError:
+                raise FileNotFoundError(f"Image file not found: {file_path}")
+        file_size = file_stat.st_size
+        identity = (file_stat.st_dev, file_stat.st_ino, file_size, file_stat.st_mtime_ns)
+        
+        if metadata is None:
+            # Reservar la identidad bajo el lock: otro registro concurrente del
+            # mismo archivo espera a éste y devuelve su ID en lugar de duplicarlo
+            while True:
+                with self._lock:
+                    existing_id = self._by_stat.get(identity)
+                    if existing_id in self.images:
+                        return existing_id
+                    pending = self._registering.get(identity)
+                    if pending is None:
+                        reservation = self._registering[identity] = threading.Event()
+                        break
+                pending.wait()
+            
+            try:
+                return self._register_new(
+                    file_path, metadata, load_pixel_data, file_size, identity
+                )
+            finally:
+                with self._lock:
+                    del self._registering[identity]
+                reservation.set()
+        
+        return self._register_new(file_path, metadata, load_pixel_data, file_size, identity)
+    
+    def _register_new(
+        self,
+        file_path: str,
+        metadata: Optional[ImageMetadata],
+        load_pixel_data: bool,
+        file_size: int,
+        identity: tuple
+    ) -> str:
+        """Lee, valida, registra y persiste una imagen que no estaba registrada."""
         # Cargar datos de imagen
         pixel_data, file_metadata, format_type = self.file_handler.load_image(
             file_path, load_pixel_data
@@ -90,14 +316,15 @@ class ImageManager:
         
         # Crear objeto de imagen médica
         filename = os.path.basename(file_path)
-        file_size = os.path.getsize(file_path)
         
         medical_image = MedicalImage(
             filename=filename,
             pixel_data=pixel_data if load_pixel_data else None,
             metadata=file_metadata,
             format_type=format_type,
-            file_size=file_size
+            file_size=file_size,
+            pixel_loader=None if load_pixel_data else self.file_handler.get_pixel_loader(file_path),
+            file_path=os.path.abspath(file_path)
         )
         
         # Añadir metadatos estructurados si se proporcionan
@@ -109,14 +336,60 @@ class ImageManager:
             raise ValueError("Datos de imagen inválidos")
         
         # Almacenar imagen en registro
-        self.images[medical_image.image_id] = medical_image
+        with self._lock:
+            self.images[medical_image.image_id] = medical_image
+            self._by_stat[identity] = medical_image.image_id
+            self._stat_by_id[medical_image.image_id] = identity
+            self._index_image(medical_image)
         
-        # Persistir al almacenamiento
+        # Persistir al almacenamiento y compactar los metadatos en memoria
         self._save_image_metadata(medical_image)
+        with self._lock:
+            medical_image.compact_metadata()
         
-        self.logger.info(f"Registered image: {medical_image.image_id} ({filename})")
+        self.logger.info("Registered image: %s (%s)", medical_image.image_id, filename)
         return medical_image.image_id
     
+    def register_images(
+        self,
+        file_paths: Iterable[str],
+        load_pixel_data: bool = False,
+        max_workers: Optional[int] = None
+    ) -> Iterator[Tuple[str, Optional[str], Optional[Exception]]]:
+        """
+        Registra varias imágenes en paralelo.
+        
+        La lectura de cabeceras y la escritura de metadatos son de E/S (y los
+        decodificadores nativos liberan el GIL), por lo que se reparten entre
+        hilos; el registro compartido se actualiza bajo el lock de
+        ``register_image``.
+        
+        Args:
+            file_paths (Iterable[str]): Rutas de los archivos de imagen
+            load_pixel_data (bool): Si cargar datos de píxeles en memoria
+            max_workers (Optional[int]): Número de hilos (por defecto según CPUs)
+            
+        Yields:
+            Tuple[str, Optional[str], Optional[Exception]]: (ruta, ID de imagen,
+            error) por archivo, en orden de finalización
+        """
+        if max_workers is None:
+            max_workers = min(32, (os.cpu_count() or 1) * 4)
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(
+                    self.register_image, file_path, load_pixel_data=load_pixel_data
+                ): file_path
+                for file_path in file_paths
+            }
+            
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except Exception as e:
+                    yield futures[future], None, e
+    
     def get_image(self, image_id: str) -> Optional[MedicalImage]:
         """
         Recupera una imagen médica por ID.
@@ -146,51 +419,120 @@ class ImageManager:
         """
         image = self.images.get(image_id)
         if not image:
-            self.logger.warning(f"Image not found for update: {image_id}")
+            self.logger.warning("Image not found for update: %s", image_id)
             return False
         
         # Actualizar metadatos
-        for key, value in metadata_updates.items():
-            image.update_metadata(key, value)
+        with self._lock:
+            # on_change reindexa la imagen
+            image.update_metadata_fields(metadata_updates)
         
         # Persistir cambios
         self._save_image_metadata(image)
         
-        self.logger.info(f"Updated metadata for image: {image_id}")
+        self.logger.info("Updated metadata for image: %s", image_id)
         return True
     
-    def delete_image(self, image_id: str, delete_files: bool = False) -> bool:
+    def remove_image_metadata(self, image_id: str, key: str) -> bool:
         """
-        Elimina una imagen del sistema.
+        Elimina un campo de metadatos de una imagen específica.
         
         Args:
             image_id (str): Identificador único de imagen
-            delete_files (bool): Si eliminar archivos asociados
+            key (str): Nombre del campo de metadatos a eliminar
             
         Returns:
-            bool: True si la eliminación fue exitosa, False en caso contrario
+            bool: True si el campo fue eliminado, False en caso contrario
         """
         image = self.images.get(image_id)
         if not image:
-            self.logger.warning(f"Image not found for deletion: {image_id}")
+            self.logger.warning("Image not found for update: %s", image_id)
             return False
         
-        # Remover del registro
-        del self.images[image_id]
+        with self._lock:
+            if not image.remove_metadata(key):
+                return False
+        
+        # Persistir cambios
+        self._save_image_metadata(image)
+        
+        self.logger.info("Removed metadata field '%s' from image: %s", key, image_id)
+        return True
+    
+    def delete_image(self, image_id: str, delete_files: bool = False) -> bool:
+        """
+        Elimina una imagen del sistema.
         
-        # Eliminar almacenamiento persistente
-        metadata_file = os.path.join(self.storage_path, f"{image_id}_metadata.json")
-        if os.path.exists(metadata_file):
-            os.remove(metadata_file)
+        Args:
+            image_id (str): Identificador único de imagen
+            delete_files (bool): Si eliminar archivos asociados
+            
+        Returns:
+            bool: True si la eliminación fue exitosa, False en caso contrario
+        """
+        if not self.delete_images([image_id]):
+            return False
         
         if delete_files:
             # Eliminar archivos de imagen asociados si se solicita
             # Nota: Esto requeriría rastrear rutas de archivos originales
             pass
         
-        self.logger.info(f"Deleted image: {image_id}")
         return True
     
+    def delete_images(
+        self,
+        image_ids: Iterable[str],
+        max_workers: Optional[int] = None
+    ) -> int:
+        """
+        Elimina varias imágenes del sistema en una sola operación.
+        
+        El catálogo SQLite se actualiza con una única sentencia y los archivos
+        de metadatos se eliminan en paralelo.
+        
+        Args:
+            image_ids (Iterable[str]): Identificadores únicos de imagen
+            max_workers (Optional[int]): Número de hilos para eliminar archivos
+            
+        Returns:
+            int: Número de imágenes eliminadas
+        """
+        # Remover del registro
+        removed: List[MedicalImage] = []
+        with self._lock:
+            for image_id in image_ids:
+                image = self.images.pop(image_id, None)
+                if image is None:
+                    self.logger.warning("Image not found for deletion: %s", image_id)
+                    continue
+                self._unindex_image(image_id)
+                self._forget_stat(image_id)
+                removed.append(image)
+        
+        if not removed:
+            return 0
+        
+        # Eliminar almacenamiento persistente (también archivos previos al catálogo)
+        removed_ids = [image.image_id for image in removed]
+        if self.store is not None:
+            self.store.delete_many(removed_ids)
+        
+        metadata_files = [
+            os.path.join(self.storage_path, f"{image_id}_metadata.json")
+            for image_id in removed_ids
+        ]
+        if len(metadata_files) == 1:
+            _remove_file(metadata_files[0])
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                list(executor.map(_remove_file, metadata_files))
+        
+        for image in removed:
+            self.logger.info("Deleted image: %s", image.image_id)
+        
+        return len(removed)
+    
     def search_images(
         self,
         query: str,
@@ -209,25 +551,52 @@ class ImageManager:
         matching_images = []
         query_lower = query.lower()
         
-        for image in self.images.values():
-            # Buscar en nombre de archivo
-            if query_lower in image.filename.lower():
-                matching_images.append(image)
-                continue
+        # Reducir candidatos con el índice de trigramas y verificar sólo esos
+        with self._lock:
+            candidates = self._search_candidates(query_lower)
+            if candidates is None and query_lower:
+                # Sin índice aplicable: descartar por el filtro de caracteres
+                query_bloom = _char_bloom(query_lower)
+                images: Iterable[MedicalImage] = [
+                    image for image_id, image in self.images.items()
+                    if self._char_blooms[image_id] & query_bloom == query_bloom
+                ]
+            elif candidates is None:
+                images = list(self.images.values())
+            else:
+                images = [
+                    image for image_id, image in self.images.items()
+                    if image_id in candidates
+                ]
             
-            # Buscar en metadatos
+            # Coincidencias por nombre de archivo en una sola pasada vectorizada
+            columns = self._get_columns()
+            filename_mask = np.char.find(columns["filename_lc"], query_lower) >= 0
+            filename_hits = set(columns["image_id"][filename_mask])
+        
             if search_fields:
+                # Revisar los valores distintos de cada campo, no cada imagen
+                field_hits: Set[str] = set()
                 for field in search_fields:
-                    value = image.get_metadata(field)
-                    if value and query_lower in str(value).lower():
-                        matching_images.append(image)
-                        break
+                    for value, ids in self._field_index.get(field, {}).items():
+                        if query_lower in value:
+                            field_hits |= ids
+                search_texts = None
             else:
-                # Search all metadata
-                for value in image.metadata.values():
-                    if query_lower in str(value).lower():
-                        matching_images.append(image)
-                        break
+                search_texts = [self._search_text[image.image_id][0] for image in images]
+        
+        for position, image in enumerate(images):
+            # Buscar en nombre de archivo
+            if image.image_id in filename_hits:
+                matching_images.append(image)
+                continue
+            
+            # Buscar en metadatos (textos precalculados en minúsculas)
+            if search_texts is None:
+                if image.image_id in field_hits:
+                    matching_images.append(image)
+            elif query_lower in search_texts[position]:
+                matching_images.append(image)
         
         return matching_images
     
@@ -246,23 +615,20 @@ class ImageManager:
         Returns:
             List[MedicalImage]: List of images
         """
-        images = list(self.images.values())
-        
-        # Apply format filter
-        if format_filter:
-            images = [img for img in images if img.format_type == format_filter]
-        
-        # Sort images
-        if sort_by == "creation_date":
-            images.sort(key=lambda x: x.creation_date)
-        elif sort_by == "filename":
-            images.sort(key=lambda x: x.filename)
-        elif sort_by == "last_modified":
-            images.sort(key=lambda x: x.last_modified)
-        elif sort_by == "file_size":
-            images.sort(key=lambda x: x.file_size or 0)
-        
-        return images
+        with self._lock:
+            columns = self._get_columns()
+            
+            # Sort images (stable, so ties keep registration order)
+            if sort_by in _SORT_KEYS:
+                positions = self._get_sort_order(columns, sort_by)
+            else:
+                positions = np.arange(len(columns["image_id"]))
+            
+            # Apply format filter (keeps the sorted order)
+            if format_filter:
+                positions = positions[columns["format_type"][positions] == format_filter]
+            
+            return [self.images[image_id] for image_id in columns["image_id"][positions]]
     
     def get_statistics(self) -> Dict[str, Any]:
         """
@@ -274,21 +640,17 @@ class ImageManager:
         if not self.images:
             return {"total_images": 0}
         
-        formats = {}
-        total_size = 0
-        with_pixel_data = 0
+        with self._lock:
+            columns = self._get_columns()
+            images = list(self.images.values())
         
-        for image in self.images.values():
-            # Count formats
-            formats[image.format_type] = formats.get(image.format_type, 0) + 1
-            
-            # Total file size
-            if image.file_size:
-                total_size += image.file_size
-            
-            # Images with pixel data
-            if image.pixel_data is not None:
-                with_pixel_data += 1
+        # Count formats and total file size from the cached columns
+        format_names, format_counts = np.unique(columns["format_type"], return_counts=True)
+        formats = dict(zip(format_names.tolist(), format_counts.tolist()))
+        total_size = int(columns["file_size"].sum())
+        
+        # Images with pixel data (can change on lazy loads, so not cached)
+        with_pixel_data = sum(1 for image in images if image.has_pixel_data)
         
         return {
             "total_images": len(self.images),
@@ -310,19 +672,24 @@ class ImageManager:
             bool: True si la exportación fue exitosa, False en caso contrario
         """
         try:
+            # Instantánea de las referencias; los registros se generan al escribir
+            images = list(self.images.values())
+            
             if format_type.lower() == "json":
-                metadata_list = []
-                for image in self.images.values():
-                    metadata_list.append({
-                        "image_id": image.image_id,
-                        "filename": image.filename,
-                        "format_type": image.format_type,
-                        "creation_date": image.creation_date.isoformat(),
-                        "metadata": image.metadata
-                    })
-                
-                with open(output_file, 'w') as f:
-                    json.dump(metadata_list, f, indent=2, default=str)
+                # Escribir el array registro a registro, sin construir la lista completa
+                with open(output_file, 'wb') as f:
+                    f.write(b'[')
+                    for i, image in enumerate(images):
+                        if i:
+                            f.write(b',')
+                        f.write(_json_bytes({
+                            "image_id": image.image_id,
+                            "filename": image.filename,
+                            "format_type": image.format_type,
+                            "creation_date": image.creation_date.isoformat(),
+                            "metadata": image.read_metadata()
+                        }))
+                    f.write(b']')
             
             elif format_type.lower() == "csv":
                 import csv
@@ -335,71 +702,302 @@ class ImageManager:
                     ])
                     
                     # Escribir datos
-                    for image in self.images.values():
-                        writer.writerow([
+                    writer.writerows(
+                        [
                             image.image_id,
                             image.filename,
                             image.format_type,
                             image.creation_date.isoformat(),
                             image.file_size,
-                            json.dumps(image.metadata)
-                        ])
+                            _json_bytes(image.read_metadata()).decode()
+                        ]
+                        for image in images
+                    )
             
-            self.logger.info(f"Exported metadata to: {output_file}")
+            self.logger.info("Exported metadata to: %s", output_file)
             return True
             
         except Exception as e:
-            self.logger.error(f"Failed to export metadata: {e}")
+            self.logger.error("Failed to export metadata: %s", e)
             return False
     
+    def _get_columns(self) -> Dict[str, np.ndarray]:
+        """
+        Obtiene las columnas paralelas del registro, reconstruyéndolas si hace falta.
+        
+        Returns:
+            Dict[str, np.ndarray]: Arrays de IDs, nombres (también en minúsculas),
+            formatos, tamaños y fechas
+        """
+        columns = self._columns
+        if columns is None or self._columns_version != self.images.version:
+            images = list(self.images.values())
+            count = len(images)
+            filenames = np.array([img.filename for img in images], dtype=np.str_)
+            columns = {
+                "image_id": np.array([img.image_id for img in images], dtype=object),
+                "filename": filenames,
+                "filename_lc": np.char.lower(filenames),
+                "format_type": np.array([img.format_type for img in images], dtype=np.str_),
+                "file_size": np.fromiter(
+                    (img.file_size or 0 for img in images), dtype=np.int64, count=count
+                ),
+                "creation_date": np.array(
+                    [img.creation_date for img in images], dtype="datetime64[us]"
+                ),
+                "last_modified": np.array(
+                    [img.last_modified for img in images], dtype="datetime64[us]"
+                )
+            }
+            self._columns = columns
+            self._columns_version = self.images.version
+        return columns
+    
+    def _forget_stat(self, image_id: str) -> None:
+        """Olvida la identidad de archivo de una imagen eliminada o modificada."""
+        identity = self._stat_by_id.pop(image_id, None)
+        if identity is not None and self._by_stat.get(identity) == image_id:
+            del self._by_stat[identity]
+    
+    def _image_changed(self, image: MedicalImage) -> None:
+        """
+        Actualiza columnas e índices cuando cambian los metadatos de una imagen.
+        
+        Se invoca también para los cambios hechos directamente sobre una imagen
+        obtenida con ``get_image``. Hasta que se persiste, el índice del
+        catálogo SQLite no refleja el cambio, así que la imagen se revisa en
+        todas las búsquedas.
+        """
+        with self._lock:
+            self.images.version += 1
+            if self.images.get(image.image_id) is image:
+                self._index_image(image)
+                # Ya no refleja sólo el archivo: volver a registrarlo lo relee
+                self._forget_stat(image.image_id)
+                if self.store is not None:
+                    self._store_stale.add(image.image_id)
+    
+    def _get_sort_order(self, columns: Dict[str, np.ndarray], sort_by: str) -> np.ndarray:
+        """
+        Obtiene el orden de las columnas por un campo, memorizado junto a ellas.
+        
+        Returns:
+            np.ndarray: Posiciones ordenadas de forma estable por ``sort_by``
+        """
+        key = "order:" + sort_by
+        order = columns.get(key)
+        if order is None:
+            order = np.argsort(columns[sort_by], kind="stable")
+            columns[key] = order
+        return order
+    
+    def _build_search_text(self, image: MedicalImage) -> Tuple[str, Dict[str, str]]:
+        """
+        Calcula los textos de búsqueda en minúsculas de los metadatos de una imagen.
+        
+        Returns:
+            Tuple[str, Dict[str, str]]: Todos los valores unidos por '\\x00' (que
+            no aparece en las consultas) y los valores no vacíos por campo
+        """
+        metadata = image.read_metadata()
+        values = [str(value).lower() for value in metadata.values()]
+        field_texts = {
+            key: text for (key, value), text in zip(metadata.items(), values)
+            if value
+        }
+        return "\x00".join(values), field_texts
+    
+    def _index_image(self, image: MedicalImage) -> None:
+        """Indexa los trigramas del nombre de archivo y metadatos de una imagen."""
+        self._unindex_image(image.image_id)
+        
+        search_text = self._build_search_text(image)
+        self._search_text[image.image_id] = search_text
+        self._char_blooms[image.image_id] = _char_bloom(
+            image.filename.lower() + search_text[0]
+        )
+        for field, text in search_text[1].items():
+            self._field_index.setdefault(field, {}).setdefault(text, set()).add(
+                image.image_id
+            )
+        
+        if self.store is not None:
+            # El catálogo SQLite mantiene su propio índice de trigramas
+            return
+        
+        grams = _trigrams(image.filename.lower())
+        for text in search_text[0].split("\x00"):
+            grams |= _trigrams(text)
+        
+        for gram in grams:
+            self._trigram_index.setdefault(gram, set()).add(image.image_id)
+        self._image_trigrams[image.image_id] = grams
+    
+    def _unindex_image(self, image_id: str) -> None:
+        """Elimina una imagen del índice de trigramas y del índice por campo."""
+        self._store_stale.discard(image_id)
+        search_text = self._search_text.pop(image_id, None)
+        self._char_blooms.pop(image_id, None)
+        if search_text is not None:
+            for field, text in search_text[1].items():
+                values = self._field_index[field]
+                values[text].discard(image_id)
+                if not values[text]:
+                    del values[text]
+                    if not values:
+                        del self._field_index[field]
+        for gram in self._image_trigrams.pop(image_id, ()):
+            postings = self._trigram_index.get(gram)
+            if postings is not None:
+                postings.discard(image_id)
+                if not postings:
+                    del self._trigram_index[gram]
+    
+    def _search_candidates(self, query_lower: str) -> Optional[Set[str]]:
+        """
+        Obtiene los IDs de imagen que pueden contener la consulta.
+        
+        Args:
+            query_lower (str): Consulta en minúsculas
+            
+        Returns:
+            Optional[Set[str]]: IDs candidatos, o None si deben revisarse todas
+            las imágenes (consulta vacía, o corta con el catálogo SQLite)
+        """
+        # Sincronizar imágenes añadidas o retiradas directamente en self.images
+        for image_id in self.images.keys() - self._search_text.keys():
+            self._index_image(self.images[image_id])
+        for image_id in self._search_text.keys() - self.images.keys():
+            self._unindex_image(image_id)
+        
+        if self.store is not None:
+            candidates = self.store.search(query_lower)
+            if candidates is not None and self._store_stale:
+                candidates |= self._store_stale
+            return candidates
+        
+        if not query_lower:
+            return None
+        
+        # Consultas de 1-2 caracteres: unir las listas de las claves que las contienen
+        if len(query_lower) < 3:
+            candidates: Set[str] = set()
+            for gram, ids in self._trigram_index.items():
+                if query_lower in gram:
+                    candidates |= ids
+            return candidates
+        
+        query_grams = _trigrams(query_lower)
+        postings = []
+        for gram in query_grams:
+            ids = self._trigram_index.get(gram)
+            if not ids:
+                return set()
+            postings.append(ids)
+        
+        postings.sort(key=len)
+        return set.intersection(*postings)
+    
     def _load_existing_images(self) -> None:
         """Carga imágenes existentes desde el almacenamiento persistente."""
         if not os.path.exists(self.storage_path):
             return
         
-        for filename in os.listdir(self.storage_path):
-            if filename.endswith('_metadata.json'):
+        # Con catálogo SQLite poblado basta una única consulta
+        if self.store is not None and self.store.count() > 0:
+            for data in self.store.load_all():
                 try:
-                    metadata_file = os.path.join(self.storage_path, filename)
-                    with open(metadata_file, 'r') as f:
-                        data = json.load(f)
-                    
-                    # Reconstruir objeto de imagen médica
-                    image = MedicalImage(
-                        filename=data['filename'],
-                        pixel_data=None,  # Datos de píxeles no almacenados en metadatos
-                        metadata=data['metadata'],
-                        format_type=data['format_type'],
-                        file_size=data.get('file_size')
+                    self._add_loaded_image(self._image_from_record(data))
+                except Exception as e:
+                    self.logger.warning(
+                        "Failed to load image metadata for %s: %s", data.get('image_id'), e
                     )
-                    image.image_id = data['image_id']
-                    image.creation_date = datetime.fromisoformat(data['creation_date'])
-                    image.last_modified = datetime.fromisoformat(data['last_modified'])
+            return
+        
+        with os.scandir(self.storage_path) as entries:
+            metadata_files = [
+                entry.path for entry in entries if entry.name.endswith('_metadata.json')
+            ]
+        
+        # Leer los archivos en paralelo (E/S) e incorporarlos en este hilo, en orden
+        with ThreadPoolExecutor(max_workers=_LOAD_WORKERS) as executor:
+            for metadata_file, (data, error) in zip(
+                metadata_files, executor.map(_read_json_file, metadata_files)
+            ):
+                try:
+                    if error is not None:
+                        raise error
                     
-                    self.images[image.image_id] = image
+                    image = self._image_from_record(data)
+                    self._add_loaded_image(image)
+                    
+                    # Migrar al catálogo SQLite en el primer arranque
+                    if self.store is not None:
+                        self.store.upsert(self._image_record(image))
                     
                 except Exception as e:
-                    self.logger.warning(f"Failed to load image metadata from {filename}: {e}")
+                    self.logger.warning(
+                        "Failed to load image metadata from %s: %s",
+                        os.path.basename(metadata_file), e
+                    )
     
-    def _save_image_metadata(self, image: MedicalImage) -> None:
-        """Guarda metadatos de imagen en almacenamiento persistente."""
-        metadata_file = os.path.join(self.storage_path, f"{image.image_id}_metadata.json")
-        
-        data = {
+    def _add_loaded_image(self, image: MedicalImage) -> None:
+        """Añade al registro e índice una imagen cargada del almacenamiento."""
+        self.images[image.image_id] = image
+        self._index_image(image)
+        image.compact_metadata()
+    
+    def _image_from_record(self, data: Dict[str, Any]) -> MedicalImage:
+        """Reconstruye una MedicalImage a partir de su registro persistido."""
+        file_path = data.get('file_path')
+        image = MedicalImage(
+            filename=data['filename'],
+            pixel_data=None,  # Datos de píxeles no almacenados en metadatos
+            metadata=data['metadata'],
+            format_type=data['format_type'],
+            file_size=data.get('file_size'),
+            pixel_loader=(
+                self.file_handler.get_pixel_loader(file_path)
+                if file_path else None
+            ),
+            file_path=file_path
+        )
+        image.image_id = data['image_id']
+        image.creation_date = datetime.fromisoformat(data['creation_date'])
+        image.last_modified = datetime.fromisoformat(data['last_modified'])
+        return image
+    
+    def _image_record(self, image: MedicalImage) -> Dict[str, Any]:
+        """Construye el registro serializable de una imagen."""
+        return {
             "image_id": image.image_id,
             "filename": image.filename,
             "format_type": image.format_type,
             "creation_date": image.creation_date.isoformat(),
             "last_modified": image.last_modified.isoformat(),
             "file_size": image.file_size,
-            "metadata": image.metadata
+            "file_path": image.file_path,
+            "metadata": image.read_metadata()
         }
+    
+    def _save_image_metadata(self, image: MedicalImage) -> None:
+        """Guarda metadatos de imagen en almacenamiento persistente."""
+        metadata_file = os.path.join(self.storage_path, f"{image.image_id}_metadata.json")
+        
+        data = self._image_record(image)
         
         try:
-            with open(metadata_file, 'w') as f:
-                json.dump(data, f, indent=2, default=str)
+            if self.store is not None:
+                # El catálogo SQLite sustituye a los archivos por imagen
+                self.store.upsert(data)
+                with self._lock:
+                    self._store_stale.discard(image.image_id)
+            else:
+                with open(metadata_file, 'wb') as f:
+                    # JSON compacto: sigue siendo editable, sin el coste de la indentación
+                    f.write(_json_bytes(data))
         except Exception as e:
-            self.logger.error(f"Failed to save metadata for {image.image_id}: {e}")
+            self.logger.error("Failed to save metadata for %s: %s", image.image_id, e)
     
     def __len__(self) -> int:
         """Return the number of managed images."""
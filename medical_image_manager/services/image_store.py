@@ -0,0 +1,226 @@
+"""
+Módulo de Servicio de Almacén de Imágenes
+=========================================
+
+Este módulo proporciona un catálogo persistente en SQLite para las imágenes
+registradas, con un índice de texto completo (FTS5) sobre el nombre de archivo
+y los valores de metadatos.
+
+Clases:
+    ImageStore: Catálogo SQLite de imágenes y metadatos
+"""
+
+from typing import Dict, Any, Iterator, List, Optional, Set
+import json
+import logging
+import sqlite3
+import threading
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# IDs por sentencia DELETE (SQLite < 3.32 admite 999 parámetros)
+_DELETE_BATCH_SIZE = 500
+
+
+def _encode_record(record: Dict[str, Any]) -> str:
+    """Serializa un registro a JSON compacto, con orjson si está instalado."""
+    if orjson is not None:
+        return orjson.dumps(
+            record,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+            default=str
+        ).decode()
+    return json.dumps(record, separators=(',', ':'), default=str)
+
+
+def _decode_record(text: str) -> Dict[str, Any]:
+    """Deserializa un registro JSON, con orjson si está instalado."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+class ImageStore:
+    """
+    Catálogo SQLite de imágenes médicas registradas.
+    
+    Guarda un registro por imagen (el mismo diccionario que los archivos
+    ``_metadata.json``) y mantiene una tabla virtual FTS5 con tokenizador de
+    trigramas, lo que permite búsquedas por subcadena sin recorrer todas las
+    imágenes en Python.
+    
+    Atributos:
+        db_path (str): Ruta del archivo de base de datos
+        supports_substring_search (bool): Si FTS5 con trigramas está disponible
+        logger (logging.Logger): Instancia del logger
+    """
+    
+    def __init__(self, db_path: str):
+        """
+        Inicializa el ImageStore y crea el esquema si no existe.
+        
+        Args:
+            db_path (str): Ruta del archivo de base de datos SQLite
+        """
+        self.db_path = db_path
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        
+        self._conn = sqlite3.connect(
+            db_path, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        
+        self.supports_substring_search = self._create_schema()
+    
+    def _create_schema(self) -> bool:
+        """
+        Crea las tablas del catálogo.
+        
+        Returns:
+            bool: True si el índice FTS5 usa el tokenizador de trigramas
+        """
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS images ("
+            "image_id TEXT PRIMARY KEY, "
+            "filename TEXT, "
+            "format_type TEXT, "
+            "file_size INTEGER, "
+            "creation_date TEXT, "
+            "last_modified TEXT, "
+            "record TEXT NOT NULL)"
+        )
+        
+        try:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS image_fts USING fts5("
+                "image_id UNINDEXED, filename, metadata, tokenize='trigram')"
+            )
+            return True
+        except sqlite3.OperationalError as e:
+            # SQLite < 3.34 no incluye el tokenizador de trigramas
+            self.logger.warning("FTS5 trigram index not available: %s", e)
+            return False
+    
+    def upsert(self, record: Dict[str, Any]) -> None:
+        """
+        Inserta o reemplaza el registro de una imagen.
+        
+        Args:
+            record (Dict[str, Any]): Registro serializable de la imagen
+        """
+        # Serializar fuera del lock, que sólo protege la conexión
+        record_json = _encode_record(record)
+        metadata_text = "\n".join(str(value) for value in record["metadata"].values())
+        
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        record["image_id"],
+                        record["filename"],
+                        record["format_type"],
+                        record["file_size"],
+                        record["creation_date"],
+                        record["last_modified"],
+                        record_json
+                    )
+                )
+                if self.supports_substring_search:
+                    self._conn.execute(
+                        "DELETE FROM image_fts WHERE image_id = ?", (record["image_id"],)
+                    )
+                    self._conn.execute(
+                        "INSERT INTO image_fts VALUES (?, ?, ?)",
+                        (record["image_id"], record["filename"], metadata_text)
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+    
+    def delete(self, image_id: str) -> None:
+        """
+        Elimina el registro de una imagen.
+        
+        Args:
+            image_id (str): Identificador único de imagen
+        """
+        self.delete_many([image_id])
+    
+    def delete_many(self, image_ids: List[str]) -> None:
+        """
+        Elimina los registros de varias imágenes en una sola transacción.
+        
+        Args:
+            image_ids (List[str]): Identificadores únicos de imagen
+        """
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                # Lotes por debajo del límite de parámetros de SQLite
+                for start in range(0, len(image_ids), _DELETE_BATCH_SIZE):
+                    batch = image_ids[start:start + _DELETE_BATCH_SIZE]
+                    placeholders = ",".join("?" * len(batch))
+                    self._conn.execute(
+                        f"DELETE FROM images WHERE image_id IN ({placeholders})", batch
+                    )
+                    if self.supports_substring_search:
+                        self._conn.execute(
+                            f"DELETE FROM image_fts WHERE image_id IN ({placeholders})",
+                            batch
+                        )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+    
+    def load_all(self) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre todos los registros almacenados.
+        
+        Returns:
+            Iterator[Dict[str, Any]]: Registros de imagen
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT record FROM images").fetchall()
+        for (record,) in rows:
+            yield _decode_record(record)
+    
+    def count(self) -> int:
+        """Devuelve el número de imágenes almacenadas."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+    
+    def search(self, query: str) -> Optional[Set[str]]:
+        """
+        Busca imágenes cuyo nombre de archivo o metadatos contienen la consulta.
+        
+        Args:
+            query (str): Subcadena a buscar (sin distinguir mayúsculas)
+        
+        Returns:
+            Optional[Set[str]]: IDs candidatos, o None si la consulta no puede
+            resolverse con el índice (menos de 3 caracteres o sin trigramas)
+        """
+        if not self.supports_substring_search or len(query) < 3:
+            return None
+        
+        phrase = '"' + query.replace('"', '""') + '"'
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT image_id FROM image_fts WHERE image_fts MATCH ?", (phrase,)
+            ).fetchall()
+        return {image_id for (image_id,) in rows}
+    
+    def close(self) -> None:
+        """Cierra la conexión con la base de datos."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,36 @@
+"""
+Módulo de Utilidad de Reloj
+===========================
+
+Este módulo proporciona una marca de tiempo compartida para los modelos.
+
+Funciones:
+    cached_now: Fecha y hora actual con una granularidad de ~1 ms
+"""
+
+from datetime import datetime
+from typing import Optional
+import time
+
+
+# Marca de tiempo compartida, refrescada como mucho una vez por milisegundo
+_LAST_MONO: float = 0.0
+_LAST_DT: Optional[datetime] = None
+
+
+def cached_now() -> datetime:
+    """
+    Obtener la fecha y hora actual con una granularidad de ~1 ms.
+    
+    Evita construir un ``datetime`` nuevo en cada creación o modificación
+    durante operaciones masivas.
+    
+    Returns:
+        datetime: Fecha y hora actual (cacheada)
+    """
+    global _LAST_MONO, _LAST_DT
+    mono = time.monotonic()
+    if _LAST_DT is None or mono - _LAST_MONO > 1e-3:
+        _LAST_DT = datetime.now()
+        _LAST_MONO = mono
+    return _LAST_DT
@@ -8,12 +8,152 @@ Clases:
     FileHandler: Clase principal para operaciones de archivos y manejo de formatos
 """
 
+import copy
 import os
+import threading
 import numpy as np
-from typing import Tuple, Optional, Dict, Any, Union
+from collections import OrderedDict
+from collections.abc import MutableSequence
+from functools import lru_cache
+from typing import Tuple, Optional, Dict, Any, Union, Callable
 import logging
 
 
+# Entradas máximas de las cachés de detección de formato e información de archivo
+FILE_CACHE_SIZE = 4096
+
+# Entradas máximas de la caché de cabeceras de load_image (sin píxeles)
+LOAD_CACHE_SIZE = 512
+
+# Extensiones de archivo reconocidas -> formato
+SUPPORTED_EXTENSIONS = {
+    '.dcm': 'DICOM',
+    '.dicom': 'DICOM',
+    '.nii': 'NIfTI',
+    '.nii.gz': 'NIfTI',
+    '.img': 'ANALYZE',
+    '.hdr': 'ANALYZE',
+    '.png': 'PNG',
+    '.jpg': 'JPEG',
+    '.jpeg': 'JPEG',
+    '.tiff': 'TIFF',
+    '.tif': 'TIFF'
+}
+
+# Tipos de píxel que se conservan al cargar volúmenes (los que DataValidator
+# admite por defecto); el resto se convierte a float64
+DEFAULT_PIXEL_DTYPES = (
+    np.uint8, np.uint16, np.uint32,
+    np.int8, np.int16, np.int32,
+    np.float32, np.float64
+)
+_DEFAULT_PIXEL_TYPES = frozenset(DEFAULT_PIXEL_DTYPES)
+
+
+# VR de DICOM que no se copian a los metadatos: secuencias y datos binarios
+_SKIPPED_DICOM_VRS = frozenset(('SQ', 'OB', 'OW', 'OF', 'OD', 'OL', 'OV', 'UN'))
+
+
+def _extension_format(
+    file_path_lower: str,
+    formats: Dict[str, str] = SUPPORTED_EXTENSIONS
+) -> Optional[str]:
+    """
+    Obtiene el formato de una ruta (en minúsculas) a partir de su extensión.
+    
+    La extensión compuesta '.nii.gz' se comprueba primero; el resto se
+    resuelve con una sola búsqueda en el diccionario.
+    """
+    if file_path_lower.endswith('.nii.gz'):
+        return 'NIfTI'
+    extension = os.path.splitext(file_path_lower)[1]
+    if not extension:
+        # splitext trata los nombres formados sólo por la extensión ('.dcm')
+        # como ocultos y sin extensión; el nombre completo es la extensión
+        extension = os.path.basename(file_path_lower)
+    return formats.get(extension)
+
+
+def _dicom_value(value: Any) -> Any:
+    """
+    Convierte el valor de un elemento DICOM a un tipo nativo de Python.
+    
+    Los números y cadenas se conservan (sin las subclases de pydicom), los
+    valores múltiples pasan a listas y el resto (PersonName, etc.) a cadena.
+    """
+    if isinstance(value, str):
+        return str(value)
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, float):
+        return float(value)
+    if isinstance(value, (list, tuple, MutableSequence)):
+        return [_dicom_value(item) for item in value]
+    if value is None:
+        return None
+    return str(value)
+
+
+# Valores de metadatos inmutables, que las copias pueden compartir
+_IMMUTABLE_TYPES = (str, int, float, bool, bytes, type(None))
+
+
+def _copy_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Copia unos metadatos cacheados para que no se compartan con el llamador.
+    
+    Los valores anidados (listas, diccionarios, cabeceras) se copian en
+    profundidad; los escalares inmutables se comparten.
+    """
+    return {
+        key: value if isinstance(value, _IMMUTABLE_TYPES) else copy.deepcopy(value)
+        for key, value in metadata.items()
+    }
+
+
+@lru_cache(maxsize=FILE_CACHE_SIZE)
+def _is_dicom_file(file_path: str, mtime_ns: int, size: int) -> bool:
+    """
+    Comprueba si un archivo sin extensión conocida es DICOM.
+    
+    La fecha de modificación y el tamaño forman parte de la clave de caché, de
+    modo que el resultado se recalcula si el archivo cambia en disco.
+    """
+    try:
+        import pydicom
+        pydicom.dcmread(file_path, stop_before_pixels=True)
+        return True
+    except Exception:
+        return False
+
+
+@lru_cache(maxsize=8)
+def _nifti_header_fields(dtype: np.dtype) -> Tuple[Tuple[str, bool], ...]:
+    """
+    Obtiene las claves de metadatos de un tipo de cabecera NIfTI.
+    
+    El tipo estructurado es fijo para cada versión de NIfTI, por lo que se
+    calcula una sola vez: (clave 'nifti_<campo>', si el campo es un array).
+    """
+    return tuple((f"nifti_{name}", bool(dtype[name].shape)) for name in dtype.names)
+
+
+def _volume_pixels(img: Any) -> np.ndarray:
+    """
+    Obtiene los píxeles de una imagen de nibabel.
+    
+    Se conserva el tipo nativo (mapeado en memoria en archivos sin comprimir)
+    cuando es uno de los admitidos por defecto; otros tipos, como las máscaras
+    de etiquetas int64, se convierten a float64 como hacía ``get_fdata``.
+    """
+    pixel_data = np.asanyarray(img.dataobj)
+    if pixel_data.dtype.type not in _DEFAULT_PIXEL_TYPES:
+        pixel_data = np.asarray(pixel_data, dtype=np.float64)
+    return pixel_data
+
+
 class FileHandler:
     """
     Clase de utilidad para manejar archivos de imágenes médicas.
@@ -31,19 +171,14 @@ class FileHandler:
         self.logger = logging.getLogger(__name__)
         
         # Supported file formats
-        self.supported_formats = {
-            '.dcm': 'DICOM',
-            '.dicom': 'DICOM',
-            '.nii': 'NIfTI',
-            '.nii.gz': 'NIfTI',
-            '.img': 'ANALYZE',
-            '.hdr': 'ANALYZE',
-            '.png': 'PNG',
-            '.jpg': 'JPEG',
-            '.jpeg': 'JPEG',
-            '.tiff': 'TIFF',
-            '.tif': 'TIFF'
-        }
+        self.supported_formats = dict(SUPPORTED_EXTENSIONS)
+        
+        # Caché de get_file_info: (ruta, mtime, tamaño) -> información
+        self._file_info_cache: Dict[Tuple[str, int, int], Dict[str, Any]] = {}
+        
+        # Caché LRU de cabeceras de load_image: (ruta, mtime, tamaño) -> (metadatos, formato)
+        self._load_cache: 'OrderedDict[tuple, Tuple[Dict[str, Any], str]]' = OrderedDict()
+        self._load_cache_lock = threading.Lock()
     
     def load_image(
         self,
@@ -53,6 +188,10 @@ class FileHandler:
         """
         Load a medical image file.
         
+        Header-only loads (``load_pixel_data=False``) are cached per file
+        version (path, mtime and size) and their metadata is returned as a
+        copy; pixel data is always read from the file and never retained.
+        
         Args:
             file_path (str): Path to the image file
             load_pixel_data (bool): Whether to load pixel data
@@ -65,22 +204,85 @@ class FileHandler:
             FileNotFoundError: If file doesn't exist
             ValueError: If format is not supported
         """
-        if not os.path.exists(file_path):
+        try:
+            stat = os.stat(file_path)
+        except OSError:
             raise FileNotFoundError(f"File not found: {file_path}")
         
+        if load_pixel_data:
+            return self._read_image(file_path, load_pixel_data)
+        
+        key = (file_path, stat.st_mtime_ns, stat.st_size)
+        with self._load_cache_lock:
+            cached = self._load_cache.get(key)
+            if cached is not None:
+                self._load_cache.move_to_end(key)
+        if cached is not None:
+            metadata, format_type = cached
+            return None, _copy_metadata(metadata), format_type
+        
+        result = self._read_image(file_path, load_pixel_data)
+        
+        # The cached entry must not be shared with the caller
+        _, metadata, format_type = result
+        self._cache_header(key, (_copy_metadata(metadata), format_type))
+        return result
+    
+    def _read_image(
+        self,
+        file_path: str,
+        load_pixel_data: bool
+    ) -> Tuple[Optional[np.ndarray], Dict[str, Any], str]:
+        """Read an image file with the loader for its format."""
         # Determine file format
         format_type = self._detect_format(file_path)
         
         if format_type == 'DICOM':
-            return self._load_dicom(file_path, load_pixel_data)
+            result = self._load_dicom(file_path, load_pixel_data)
         elif format_type == 'NIfTI':
-            return self._load_nifti(file_path, load_pixel_data)
+            result = self._load_nifti(file_path, load_pixel_data)
         elif format_type == 'ANALYZE':
-            return self._load_analyze(file_path, load_pixel_data)
+            result = self._load_analyze(file_path, load_pixel_data)
         elif format_type in ['PNG', 'JPEG', 'TIFF']:
-            return self._load_standard_image(file_path, load_pixel_data)
+            result = self._load_standard_image(file_path, load_pixel_data)
         else:
             raise ValueError(f"Unsupported format: {format_type}")
+        
+        return result
+    
+    def _cache_header(self, key: tuple, entry: Tuple[Dict[str, Any], str]) -> None:
+        """
+        Store a header-only load_image result, evicting the least recently used.
+        
+        Args:
+            key (tuple): Cache key (path, mtime, size)
+            entry (Tuple[Dict[str, Any], str]): Private copy of (metadata, format_type)
+        """
+        with self._load_cache_lock:
+            self._load_cache[key] = entry
+            self._load_cache.move_to_end(key)
+            if len(self._load_cache) > LOAD_CACHE_SIZE:
+                self._load_cache.popitem(last=False)
+    
+    def get_pixel_loader(self, file_path: str) -> Callable[[], Optional[np.ndarray]]:
+        """
+        Build a deferred pixel-data loader for a file.
+        
+        The returned callable reads the pixel data only when invoked, so
+        images can be registered from their headers alone and have their
+        pixels paged in on first access.
+        
+        Args:
+            file_path (str): Path to the image file
+            
+        Returns:
+            Callable[[], Optional[np.ndarray]]: Function that loads the pixel data
+        """
+        def load_pixels() -> Optional[np.ndarray]:
+            pixel_data, _, _ = self.load_image(file_path, load_pixel_data=True)
+            return pixel_data
+        
+        return load_pixels
     
     def save_image(
         self,
@@ -110,11 +312,11 @@ class FileHandler:
             elif format_type in ['PNG', 'JPEG', 'TIFF']:
                 return self._save_standard_image(pixel_data, file_path)
             else:
-                self.logger.error(f"Saving not supported for format: {format_type}")
+                self.logger.error("Saving not supported for format: %s", format_type)
                 return False
                 
         except Exception as e:
-            self.logger.error(f"Failed to save image: {e}")
+            self.logger.error("Failed to save image: %s", e)
             return False
     
     def _detect_format(self, file_path: str) -> str:
@@ -127,24 +329,18 @@ class FileHandler:
         Returns:
             str: Detected format type
         """
-        file_path_lower = file_path.lower()
-        
-        # Check for compound extensions first
-        if file_path_lower.endswith('.nii.gz'):
-            return 'NIfTI'
+        format_type = _extension_format(file_path.lower(), self.supported_formats)
+        if format_type is not None:
+            return format_type
         
-        # Check single extensions
-        for ext, format_type in self.supported_formats.items():
-            if file_path_lower.endswith(ext):
-                return format_type
-        
-        # Try to detect DICOM files without extension
+        # Try to detect DICOM files without extension (cached per file version)
         try:
-            import pydicom
-            pydicom.dcmread(file_path, stop_before_pixels=True)
+            stat = os.stat(file_path)
+        except OSError:
+            return 'Unknown'
+        
+        if _is_dicom_file(file_path, stat.st_mtime_ns, stat.st_size):
             return 'DICOM'
-        except:
-            pass
         
         return 'Unknown'
     
@@ -165,15 +361,16 @@ class FileHandler:
                 ds = pydicom.dcmread(file_path, stop_before_pixels=True)
                 pixel_data = None
             
-            # Extract metadata
+            # Extract metadata as native values, skipping sequences and binary data
             metadata = {}
             for elem in ds:
-                if elem.VR != 'SQ':  # Skip sequence elements for simplicity
-                    try:
-                        key = f"{elem.tag}_{elem.keyword}" if elem.keyword else str(elem.tag)
-                        metadata[key] = str(elem.value)
-                    except:
-                        continue
+                if elem.VR in _SKIPPED_DICOM_VRS:
+                    continue
+                try:
+                    key = f"{elem.tag}_{elem.keyword}" if elem.keyword else str(elem.tag)
+                    metadata[key] = _dicom_value(elem.value)
+                except Exception:
+                    continue
             
             return pixel_data, metadata, 'DICOM'
             
@@ -181,7 +378,7 @@ class FileHandler:
             self.logger.error("pydicom library not available")
             raise ValueError("DICOM support requires pydicom library")
         except Exception as e:
-            self.logger.error(f"Failed to load DICOM file: {e}")
+            self.logger.error("Failed to load DICOM file: %s", e)
             raise
     
     def _load_nifti(
@@ -197,21 +394,19 @@ class FileHandler:
             img = nib.load(file_path)
             
             # Get pixel data if requested
-            pixel_data = img.get_fdata() if load_pixel_data else None
+            # Native dtype when allowed, memory-mapped for uncompressed files
+            pixel_data = _volume_pixels(img) if load_pixel_data else None
             
             # Extract header information as metadata
             header = img.header
             metadata = {}
             
-            # Convert header fields to metadata
-            for key in header.keys():
-                try:
-                    value = header[key]
-                    if hasattr(value, 'tolist'):
-                        value = value.tolist()
-                    metadata[f"nifti_{key}"] = value
-                except:
-                    continue
+            # Convert header fields to metadata in one structured-array walk
+            structarr = header.structarr
+            for (key, is_array), value in zip(
+                _nifti_header_fields(structarr.dtype), structarr.tolist()
+            ):
+                metadata[key] = value.tolist() if is_array else value
             
             # Add affine matrix
             metadata['nifti_affine'] = img.affine.tolist()
@@ -226,7 +421,7 @@ class FileHandler:
             self.logger.error("nibabel library not available")
             raise ValueError("NIfTI support requires nibabel library")
         except Exception as e:
-            self.logger.error(f"Failed to load NIfTI file: {e}")
+            self.logger.error("Failed to load NIfTI file: %s", e)
             raise
     
     def _load_analyze(
@@ -242,7 +437,8 @@ class FileHandler:
             img = nib.load(file_path)
             
             # Get pixel data if requested
-            pixel_data = img.get_fdata() if load_pixel_data else None
+            # Native dtype when allowed, memory-mapped for uncompressed files
+            pixel_data = _volume_pixels(img) if load_pixel_data else None
             
             # Extract metadata
             metadata = {
@@ -257,7 +453,7 @@ class FileHandler:
             self.logger.error("nibabel library not available")
             raise ValueError("ANALYZE support requires nibabel library")
         except Exception as e:
-            self.logger.error(f"Failed to load ANALYZE file: {e}")
+            self.logger.error("Failed to load ANALYZE file: %s", e)
             raise
     
     def _load_standard_image(
@@ -296,7 +492,7 @@ class FileHandler:
             self.logger.error("opencv-python library not available")
             raise ValueError("Standard image support requires opencv-python library")
         except Exception as e:
-            self.logger.error(f"Failed to load image file: {e}")
+            self.logger.error("Failed to load image file: %s", e)
             raise
     
     def _save_nifti(
@@ -320,11 +516,11 @@ class FileHandler:
             # Save to file
             nib.save(nii_img, file_path)
             
-            self.logger.info(f"Saved NIfTI image: {file_path}")
+            self.logger.info("Saved NIfTI image: %s", file_path)
             return True
             
         except Exception as e:
-            self.logger.error(f"Failed to save NIfTI image: {e}")
+            self.logger.error("Failed to save NIfTI image: %s", e)
             return False
     
     def _save_standard_image(
@@ -340,14 +536,14 @@ class FileHandler:
             success = cv2.imwrite(file_path, pixel_data)
             
             if success:
-                self.logger.info(f"Saved image: {file_path}")
+                self.logger.info("Saved image: %s", file_path)
                 return True
             else:
-                self.logger.error(f"Failed to save image: {file_path}")
+                self.logger.error("Failed to save image: %s", file_path)
                 return False
                 
         except Exception as e:
-            self.logger.error(f"Failed to save image: {e}")
+            self.logger.error("Failed to save image: %s", e)
             return False
     
     def get_file_info(self, file_path: str) -> Dict[str, Any]:
@@ -360,20 +556,29 @@ class FileHandler:
         Returns:
             Dict[str, Any]: File information
         """
-        if not os.path.exists(file_path):
+        try:
+            stat = os.stat(file_path)
+        except OSError:
             return {"error": "File not found"}
         
-        stat = os.stat(file_path)
+        key = (file_path, stat.st_mtime_ns, stat.st_size)
+        info = self._file_info_cache.get(key)
+        if info is None:
+            info = {
+                "filename": os.path.basename(file_path),
+                "file_path": file_path,
+                "file_size": stat.st_size,
+                "format_type": self._detect_format(file_path),
+                "created": stat.st_ctime,
+                "modified": stat.st_mtime,
+                "extension": os.path.splitext(file_path)[1]
+            }
+            if len(self._file_info_cache) >= FILE_CACHE_SIZE:
+                # Descartar la entrada más antigua
+                del self._file_info_cache[next(iter(self._file_info_cache))]
+            self._file_info_cache[key] = info
         
-        return {
-            "filename": os.path.basename(file_path),
-            "file_path": file_path,
-            "file_size": stat.st_size,
-            "format_type": self._detect_format(file_path),
-            "created": stat.st_ctime,
-            "modified": stat.st_mtime,
-            "extension": os.path.splitext(file_path)[1]
-        }
+        return dict(info)
     
     def validate_file(self, file_path: str) -> bool:
         """
@@ -9,11 +9,93 @@ Clases:
 """
 
 import numpy as np
-from typing import Any, List, Dict, Optional
+import threading
+import weakref
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, List, Dict, Optional, Tuple
 import logging
 
 from ..models.medical_image import MedicalImage
 from ..models.metadata import ImageMetadata
+from .file_handler import DEFAULT_PIXEL_DTYPES, SUPPORTED_EXTENSIONS, _extension_format
+
+
+# Etiquetas DICOM obligatorias (con su forma en minúsculas) y modalidades válidas
+_REQUIRED_DICOM_TAGS = tuple(
+    (tag, tag.lower())
+    for tag in ('SOPInstanceUID', 'StudyInstanceUID', 'SeriesInstanceUID', 'Modality')
+)
+_VALID_DICOM_MODALITIES = ('CT', 'MR', 'PT', 'NM', 'US', 'XA', 'RF', 'DX', 'CR', 'MG')
+
+# Entradas máximas de la caché opcional de resultados de validación de píxeles
+PIXEL_RESULT_CACHE_SIZE = 128
+
+# Tipos escalares concretos de NumPy y los abstractos que los agrupan
+_CONCRETE_SCALAR_TYPES = frozenset(np.dtype(code).type for code in np.typecodes['All'])
+_ABSTRACT_SCALAR_TYPES = frozenset((
+    np.generic, np.number, np.integer, np.signedinteger, np.unsignedinteger,
+    np.inexact, np.floating, np.complexfloating
+))
+
+# Formatos que validate_file_format reconoce
+_KNOWN_FORMATS = frozenset(SUPPORTED_EXTENSIONS.values())
+
+
+@lru_cache(maxsize=4096)
+def _is_modality_key(key: str) -> bool:
+    """Indica si una clave de metadatos es de modalidad (memorizado por clave)."""
+    return 'modality' in key.lower()
+
+
+def _find_modality_key(metadata: Dict[str, Any]) -> Optional[str]:
+    """
+    Obtiene la primera clave de modalidad de unos metadatos.
+    
+    Las claves se repiten entre imágenes (etiquetas DICOM, cabeceras NIfTI),
+    así que la comprobación memorizada evita un ``lower()`` por clave e imagen.
+    """
+    return next((key for key in metadata if _is_modality_key(key)), None)
+
+
+# Tipos escalares para los que np.dot delega en BLAS
+_BLAS_FLOAT_TYPES = frozenset((np.float32, np.float64, np.complex64, np.complex128))
+
+
+def _all_finite(pixel_data: np.ndarray) -> bool:
+    """
+    Comprueba que un array de coma flotante no contiene NaN ni infinitos.
+    
+    NaN e Inf se propagan en el producto escalar del array consigo mismo, que
+    BLAS calcula en una pasada sin crear una máscara booleana; sólo si el
+    resultado no es finito (valores inválidos o desbordamiento) se hace la
+    comprobación exacta elemento a elemento. Sólo se usa con los tipos que
+    BLAS implementa: con float16 el producto es más lento que np.isfinite y
+    suele desbordarse, obligando a recorrer el array dos veces.
+    """
+    if (pixel_data.dtype.type in _BLAS_FLOAT_TYPES
+            and (pixel_data.flags.c_contiguous or pixel_data.flags.f_contiguous)):
+        flat = pixel_data.ravel(order='K')
+        with np.errstate(over='ignore', invalid='ignore'):
+            if np.isfinite(np.dot(flat, flat)):
+                return True
+    return bool(np.isfinite(pixel_data).all())
+
+
+def _finite_errors(pixel_data: np.ndarray) -> List[str]:
+    """
+    Describe the NaN/Inf values of a floating-point array.
+    
+    One finite pass; NaN and Inf are told apart only when it fails.
+    """
+    errors = []
+    if not _all_finite(pixel_data):
+        if np.isnan(pixel_data).any():
+            errors.append("Pixel data contains NaN values")
+        
+        if np.isinf(pixel_data).any():
+            errors.append("Pixel data contains infinite values")
+    return errors
 
 
 class DataValidator:
@@ -26,25 +108,42 @@ class DataValidator:
     Atributos:
         logger (logging.Logger): Instancia del logger
         validation_rules (Dict[str, Any]): Configuración para reglas de validación
+        enable_result_cache (bool): Si se memorizan las validaciones de píxeles
     """
     
-    def __init__(self):
-        """Initialize the DataValidator."""
+    def __init__(self, enable_result_cache: bool = False):
+        """
+        Initialize the DataValidator.
+        
+        Args:
+            enable_result_cache (bool): Memoize pixel-data validation results by
+                array identity (object, buffer address, shape, strides, dtype).
+                Arrays modified in place after validation are not re-scanned
+                until ``invalidate_cache`` is called, so this is opt-in.
+        """
         self.logger = logging.getLogger(__name__)
+        self.enable_result_cache = enable_result_cache
+        
+        # Caché LRU: identidad del array -> (referencia débil, errores)
+        self._pixel_result_cache: OrderedDict = OrderedDict()
+        self._pixel_result_lock = threading.Lock()
+        
+        # Validadores especializados por (tipo escalar, número de dimensiones)
+        self._specialized: Dict[Tuple[type, int], Callable[[np.ndarray], List[str]]] = {}
         
         # Default validation rules
         self.validation_rules = {
             "max_file_size_mb": 1000,  # Maximum file size in MB
             "min_image_dimensions": (8, 8),  # Minimum image dimensions
             "max_image_dimensions": (4096, 4096, 4096),  # Maximum image dimensions
-            "allowed_dtypes": [
-                np.uint8, np.uint16, np.uint32,
-                np.int8, np.int16, np.int32,
-                np.float32, np.float64
-            ],
+            "allowed_dtypes": list(DEFAULT_PIXEL_DTYPES),
             "required_metadata_fields": [],  # No required metadata fields by default
             "max_metadata_string_length": 1000
         }
+        self._allowed_dtype_set = self._build_dtype_set()
+        self._required_field_set = frozenset(
+            self.validation_rules["required_metadata_fields"]
+        )
     
     def validate_image(self, medical_image: MedicalImage) -> bool:
         """
@@ -57,17 +156,86 @@ class DataValidator:
             bool: True if image is valid, False otherwise
         """
         try:
-            errors = self.get_validation_errors(medical_image)
-            if errors:
-                for error in errors:
-                    self.logger.warning(f"Validation error: {error}")
-                return False
+            # Cheap checks first; stop at the first one that fails so the
+            # pixel-data scan only runs for otherwise valid images
+            for check in (
+                self._check_basic_properties,
+                self._check_file_size,
+                self._check_metadata,
+                self._check_pixel_data
+            ):
+                errors = check(medical_image)
+                if errors:
+                    for error in errors:
+                        self.logger.warning("Validation error: %s", error)
+                    return False
             return True
             
         except Exception as e:
-            self.logger.error(f"Validation failed: {e}")
+            self.logger.error("Validation failed: %s", e)
             return False
     
+    def validate_batch(self, images: List[MedicalImage]) -> List[bool]:
+        """
+        Validate several images, rejecting bad pixel structure in one pass.
+        
+        The dtype, dimension count and dimension bounds of every loaded pixel
+        array are checked with vectorized comparisons first; images that fail
+        them are rejected without scanning their pixel values, and the rest go
+        through ``validate_image``.
+        
+        Args:
+            images (List[MedicalImage]): Images to validate
+            
+        Returns:
+            List[bool]: Validation result for each image, in order
+        """
+        loaded = [i for i, image in enumerate(images) if image.has_pixel_data]
+        structure_ok = dict.fromkeys(loaded, True)
+        
+        arrays = [images[i].pixel_data for i in loaded]
+        if arrays and all(isinstance(array, np.ndarray) for array in arrays):
+            max_dims = np.asarray(self.validation_rules["max_image_dimensions"])
+            width = len(max_dims)
+            min_dims = np.asarray(self.validation_rules["min_image_dimensions"])[:width]
+            count = len(arrays)
+            
+            ndims = np.fromiter((array.ndim for array in arrays), dtype=np.int64, count=count)
+            sizes = np.fromiter((array.size for array in arrays), dtype=np.int64, count=count)
+            dtype_ok = np.fromiter(
+                (array.dtype.type in self._allowed_dtype_set for array in arrays),
+                dtype=bool, count=count
+            )
+            
+            # Shapes padded to the maximum rank; absent dimensions are masked out
+            shapes = np.zeros((count, width), dtype=np.int64)
+            for row, array in enumerate(arrays):
+                shape = array.shape[:width]
+                shapes[row, :len(shape)] = shape
+            present = np.arange(width) < ndims[:, None]
+            
+            valid = (
+                dtype_ok & (sizes > 0) & (ndims >= 2) & (ndims <= width)
+                & np.all(~present | (shapes <= max_dims), axis=1)
+                & np.all(
+                    ~present[:, :len(min_dims)] | (shapes[:, :len(min_dims)] >= min_dims),
+                    axis=1
+                )
+            )
+            structure_ok = dict(zip(loaded, valid.tolist()))
+        
+        results = []
+        for i, image in enumerate(images):
+            if structure_ok.get(i, True):
+                results.append(self.validate_image(image))
+            else:
+                self.logger.warning(
+                    "Validation error: pixel data of %s has an unsupported shape or dtype",
+                    image.filename
+                )
+                results.append(False)
+        return results
+    
     def get_validation_errors(self, medical_image: MedicalImage) -> List[str]:
         """
         Get detailed validation errors for a medical image.
@@ -78,31 +246,40 @@ class DataValidator:
         Returns:
             List[str]: List of validation error messages
         """
+        return (
+            self._check_basic_properties(medical_image)
+            + self._check_file_size(medical_image)
+            + self._check_pixel_data(medical_image)
+            + self._check_metadata(medical_image)
+        )
+    
+    def _check_basic_properties(self, medical_image: MedicalImage) -> List[str]:
+        """Check the image has a filename and an ID."""
         errors = []
-        
-        # Validate basic properties
         if not medical_image.filename:
             errors.append("Filename is required")
         
         if not medical_image.image_id:
             errors.append("Image ID is required")
-        
-        # Validate file size
+        return errors
+    
+    def _check_file_size(self, medical_image: MedicalImage) -> List[str]:
+        """Check the file size is within the configured maximum."""
         if medical_image.file_size:
             max_size_bytes = self.validation_rules["max_file_size_mb"] * 1024 * 1024
             if medical_image.file_size > max_size_bytes:
-                errors.append(f"File size exceeds maximum ({medical_image.file_size} bytes)")
-        
-        # Validate pixel data if present
-        if medical_image.pixel_data is not None:
-            pixel_errors = self._validate_pixel_data(medical_image.pixel_data)
-            errors.extend(pixel_errors)
-        
-        # Validate metadata
-        metadata_errors = self._validate_metadata(medical_image.metadata)
-        errors.extend(metadata_errors)
-        
-        return errors
+                return [f"File size exceeds maximum ({medical_image.file_size} bytes)"]
+        return []
+    
+    def _check_pixel_data(self, medical_image: MedicalImage) -> List[str]:
+        """Validate the pixel data if it is loaded."""
+        if medical_image.has_pixel_data:
+            return self._validate_pixel_data(medical_image.pixel_data)
+        return []
+    
+    def _check_metadata(self, medical_image: MedicalImage) -> List[str]:
+        """Validate the metadata dictionary."""
+        return self._validate_metadata(medical_image.read_metadata())
     
     def validate_metadata(self, metadata: ImageMetadata) -> bool:
         """
@@ -118,12 +295,12 @@ class DataValidator:
             errors = metadata.validate_metadata()
             if errors:
                 for error in errors:
-                    self.logger.warning(f"Metadata validation error: {error}")
+                    self.logger.warning("Metadata validation error: %s", error)
                 return False
             return True
             
         except Exception as e:
-            self.logger.error(f"Metadata validation failed: {e}")
+            self.logger.error("Metadata validation failed: %s", e)
             return False
     
     def validate_pixel_data(self, pixel_data: np.ndarray) -> bool:
@@ -139,10 +316,76 @@ class DataValidator:
         errors = self._validate_pixel_data(pixel_data)
         if errors:
             for error in errors:
-                self.logger.warning(f"Pixel data validation error: {error}")
+                self.logger.warning("Pixel data validation error: %s", error)
             return False
         return True
     
+    def compile_specialized(
+        self,
+        dtype: Any,
+        ndim: int
+    ) -> Callable[[np.ndarray], List[str]]:
+        """
+        Build (or reuse) a pixel-data validator specialized for a dtype and rank.
+        
+        The dtype and dimension-count checks are settled when it is built and
+        the dimension limits are bound as constants, so the returned function
+        only checks emptiness, sizes and (for floating-point data) NaN/Inf.
+        Once compiled, ``_validate_pixel_data`` uses it for matching arrays.
+        
+        Args:
+            dtype (Any): NumPy dtype or scalar type, e.g. np.uint16
+            ndim (int): Number of dimensions, e.g. 3 for CT volumes
+            
+        Returns:
+            Callable[[np.ndarray], List[str]]: Validator returning error messages
+            
+        Raises:
+            ValueError: If the dtype or rank is not allowed by the current rules
+        """
+        key = (np.dtype(dtype).type, ndim)
+        specialized = self._specialized.get(key)
+        if specialized is not None:
+            return specialized
+        
+        min_dims = self.validation_rules["min_image_dimensions"]
+        max_dims = self.validation_rules["max_image_dimensions"]
+        if key[0] not in self._allowed_dtype_set:
+            raise ValueError(f"Unsupported data type: {np.dtype(dtype)}")
+        if not 2 <= ndim <= len(max_dims):
+            raise ValueError(f"Unsupported number of dimensions: {ndim}")
+        
+        limits = tuple(
+            (i, min_dims[i] if i < len(min_dims) else None, max_dims[i])
+            for i in range(ndim)
+        )
+        check_finite = np.dtype(dtype).kind in 'fc'
+        
+        def validate(pixel_data: np.ndarray) -> List[str]:
+            if pixel_data.size == 0:
+                return ["Pixel data cannot be empty"]
+            
+            errors = []
+            shape = pixel_data.shape
+            for i, min_size, max_size in limits:
+                dim_size = shape[i]
+                if min_size is not None and dim_size < min_size:
+                    errors.append(f"Dimension {i} too small: {dim_size} < {min_size}")
+                if dim_size > max_size:
+                    errors.append(f"Dimension {i} too large: {dim_size} > {max_size}")
+            
+            if check_finite:
+                errors.extend(_finite_errors(pixel_data))
+            return errors
+        
+        self._specialized[key] = validate
+        return validate
+    
+    def invalidate_cache(self) -> None:
+        """Discard memoized pixel-data validation results."""
+        with self._pixel_result_lock:
+            self._pixel_result_cache.clear()
+    
     def _validate_pixel_data(self, pixel_data: np.ndarray) -> List[str]:
         """
         Internal method to validate pixel data.
@@ -153,6 +396,29 @@ class DataValidator:
         Returns:
             List[str]: List of validation error messages
         """
+        if not self.enable_result_cache or not isinstance(pixel_data, np.ndarray):
+            return self._scan_pixel_data(pixel_data)
+        
+        key = (
+            id(pixel_data), pixel_data.ctypes.data, pixel_data.shape,
+            pixel_data.strides, pixel_data.dtype.str
+        )
+        with self._pixel_result_lock:
+            cached = self._pixel_result_cache.get(key)
+            # The weak reference rules out a new array reusing a freed id
+            if cached is not None and cached[0]() is pixel_data:
+                self._pixel_result_cache.move_to_end(key)
+                return list(cached[1])
+        
+        errors = self._scan_pixel_data(pixel_data)
+        with self._pixel_result_lock:
+            self._pixel_result_cache[key] = (weakref.ref(pixel_data), tuple(errors))
+            if len(self._pixel_result_cache) > PIXEL_RESULT_CACHE_SIZE:
+                self._pixel_result_cache.popitem(last=False)
+        return errors
+    
+    def _scan_pixel_data(self, pixel_data: np.ndarray) -> List[str]:
+        """Run every pixel-data check (the uncached path of _validate_pixel_data)."""
         errors = []
         
         # Check if it's a numpy array
@@ -160,6 +426,12 @@ class DataValidator:
             errors.append("Pixel data must be a numpy array")
             return errors
         
+        # Use a specialized validator when one was compiled for this dtype/rank
+        if self._specialized:
+            specialized = self._specialized.get((pixel_data.dtype.type, pixel_data.ndim))
+            if specialized is not None:
+                return specialized(pixel_data)
+        
         # Check array is not empty
         if pixel_data.size == 0:
             errors.append("Pixel data cannot be empty")
@@ -168,32 +440,32 @@ class DataValidator:
         # Check dimensions
         min_dims = self.validation_rules["min_image_dimensions"]
         max_dims = self.validation_rules["max_image_dimensions"]
+        shape = pixel_data.shape
+        ndim = len(shape)
         
-        if len(pixel_data.shape) < 2:
+        if ndim < 2:
             errors.append("Image must have at least 2 dimensions")
         
-        if len(pixel_data.shape) > len(max_dims):
-            errors.append(f"Image has too many dimensions: {len(pixel_data.shape)}")
+        if ndim > len(max_dims):
+            errors.append(f"Image has too many dimensions: {ndim}")
         
-        # Check dimension sizes
-        for i, dim_size in enumerate(pixel_data.shape):
-            if i < len(min_dims) and dim_size < min_dims[i]:
-                errors.append(f"Dimension {i} too small: {dim_size} < {min_dims[i]}")
-            
-            if i < len(max_dims) and dim_size > max_dims[i]:
-                errors.append(f"Dimension {i} too large: {dim_size} > {max_dims[i]}")
+        # Check dimension sizes (zip stops at the shorter of shape and limits)
+        for i, (dim_size, min_size) in enumerate(zip(shape, min_dims)):
+            if dim_size < min_size:
+                errors.append(f"Dimension {i} too small: {dim_size} < {min_size}")
         
-        # Check data type
-        allowed_dtypes = self.validation_rules["allowed_dtypes"]
-        if pixel_data.dtype.type not in allowed_dtypes:
-            errors.append(f"Unsupported data type: {pixel_data.dtype}")
+        for i, (dim_size, max_size) in enumerate(zip(shape, max_dims)):
+            if dim_size > max_size:
+                errors.append(f"Dimension {i} too large: {dim_size} > {max_size}")
         
-        # Check for invalid values
-        if np.any(np.isnan(pixel_data)):
-            errors.append("Pixel data contains NaN values")
+        # Check data type
+        dtype = pixel_data.dtype
+        if dtype.type not in self._allowed_dtype_set:
+            errors.append(f"Unsupported data type: {dtype}")
         
-        if np.any(np.isinf(pixel_data)):
-            errors.append("Pixel data contains infinite values")
+        # Check for invalid values (only floating-point data can hold NaN/Inf)
+        if dtype.kind in 'fc':
+            errors.extend(_finite_errors(pixel_data))
         
         return errors
     
@@ -209,17 +481,19 @@ class DataValidator:
         """
         errors = []
         
-        # Check required fields
-        required_fields = self.validation_rules["required_metadata_fields"]
-        for field in required_fields:
-            if field not in metadata:
-                errors.append(f"Required metadata field missing: {field}")
+        # Check required fields (one set test; list the missing ones on failure)
+        if not self._required_field_set <= metadata.keys():
+            for field in self.validation_rules["required_metadata_fields"]:
+                if field not in metadata:
+                    errors.append(f"Required metadata field missing: {field}")
         
         # Check string length limits
         max_length = self.validation_rules["max_metadata_string_length"]
-        for key, value in metadata.items():
-            if isinstance(value, str) and len(value) > max_length:
-                errors.append(f"Metadata field '{key}' exceeds maximum length: {len(value)}")
+        errors.extend(
+            f"Metadata field '{key}' exceeds maximum length: {len(value)}"
+            for key, value in metadata.items()
+            if isinstance(value, str) and len(value) > max_length
+        )
         
         return errors
     
@@ -234,27 +508,11 @@ class DataValidator:
         Returns:
             bool: True if format matches, False otherwise
         """
-        filename_lower = filename.lower()
-        
-        format_extensions = {
-            'DICOM': ['.dcm', '.dicom'],
-            'NIfTI': ['.nii', '.nii.gz'],
-            'ANALYZE': ['.img', '.hdr'],
-            'PNG': ['.png'],
-            'JPEG': ['.jpg', '.jpeg'],
-            'TIFF': ['.tiff', '.tif']
-        }
-        
-        if expected_format not in format_extensions:
-            self.logger.warning(f"Unknown format: {expected_format}")
+        if expected_format not in _KNOWN_FORMATS:
+            self.logger.warning("Unknown format: %s", expected_format)
             return False
         
-        extensions = format_extensions[expected_format]
-        for ext in extensions:
-            if filename_lower.endswith(ext):
-                return True
-        
-        return False
+        return _extension_format(filename.lower()) == expected_format
     
     def validate_dicom_compliance(self, metadata: Dict[str, Any]) -> List[str]:
         """
@@ -268,38 +526,20 @@ class DataValidator:
         """
         issues = []
         
-        # Check for required DICOM tags
-        required_tags = [
-            'SOPInstanceUID',
-            'StudyInstanceUID', 
-            'SeriesInstanceUID',
-            'Modality'
-        ]
-        
-        for tag in required_tags:
-            # Look for tag in various forms
-            found = False
-            for key in metadata.keys():
-                if tag.lower() in key.lower():
-                    found = True
-                    break
-            
-            if not found:
+        # Check for required DICOM tags: any key containing the tag. The loader
+        # stores keys as "(gggg, eeee)_Keyword", so they are lowercased once and
+        # joined with newlines (never part of a tag) for one search per tag
+        lowered_keys = "\n".join(metadata).lower()
+        for tag, tag_lower in _REQUIRED_DICOM_TAGS:
+            if tag_lower not in lowered_keys:
                 issues.append(f"Missing required DICOM tag: {tag}")
         
         # Check modality values
-        modality_key = None
-        for key in metadata.keys():
-            if 'modality' in key.lower():
-                modality_key = key
-                break
+        modality_key = _find_modality_key(metadata)
         
         if modality_key:
             modality = metadata[modality_key]
-            valid_modalities = [
-                'CT', 'MR', 'PT', 'NM', 'US', 'XA', 'RF', 'DX', 'CR', 'MG'
-            ]
-            if modality not in valid_modalities:
+            if modality not in _VALID_DICOM_MODALITIES:
                 issues.append(f"Invalid DICOM modality: {modality}")
         
         return issues
@@ -328,12 +568,13 @@ class DataValidator:
         
         # Check dimensions consistency
         if check_dimensions:
-            reference_shape = None
-            for image in images:
-                if image.pixel_data is not None:
-                    if reference_shape is None:
-                        reference_shape = image.pixel_data.shape
-                    elif image.pixel_data.shape != reference_shape:
+            shapes = [image.pixel_data.shape for image in images if image.has_pixel_data]
+            
+            # Only walk the images again to describe the mismatches
+            if len(set(shapes)) > 1:
+                reference_shape = shapes[0]
+                for image in images:
+                    if image.has_pixel_data and image.pixel_data.shape != reference_shape:
                         issues.append(
                             f"Inconsistent dimensions: {image.filename} "
                             f"has shape {image.pixel_data.shape}, "
@@ -344,11 +585,9 @@ class DataValidator:
         if check_modality:
             modalities = set()
             for image in images:
-                modality = None
-                for key, value in image.metadata.items():
-                    if 'modality' in key.lower():
-                        modality = value
-                        break
+                metadata = image.read_metadata()
+                modality_key = _find_modality_key(metadata)
+                modality = metadata[modality_key] if modality_key is not None else None
                 
                 if modality:
                     modalities.add(modality)
@@ -367,7 +606,31 @@ class DataValidator:
             value (Any): Rule value
         """
         self.validation_rules[rule_name] = value
-        self.logger.info(f"Updated validation rule: {rule_name} = {value}")
+        self.invalidate_cache()
+        # Specialized validators fold the old rules in; rebuild on demand
+        self._specialized.clear()
+        if rule_name == "allowed_dtypes":
+            self._allowed_dtype_set = self._build_dtype_set()
+        elif rule_name == "required_metadata_fields":
+            self._required_field_set = frozenset(value)
+        self.logger.info("Updated validation rule: %s = %s", rule_name, value)
+    
+    def _build_dtype_set(self) -> frozenset:
+        """
+        Build the hashed set of allowed scalar types.
+        
+        Scalar types rather than dtypes are stored, so byte order does not
+        matter (big-endian NIfTI data maps to the same np.int16 type).
+        Abstract types such as np.floating or np.integer are expanded to every
+        concrete type below them, so lookups stay a single set membership test.
+        """
+        allowed = set()
+        for dtype in self.validation_rules["allowed_dtypes"]:
+            if isinstance(dtype, type) and dtype in _ABSTRACT_SCALAR_TYPES:
+                allowed.update(t for t in _CONCRETE_SCALAR_TYPES if np.issubdtype(t, dtype))
+            else:
+                allowed.add(np.dtype(dtype).type)
+        return frozenset(allowed)
     
     def get_validation_rules(self) -> Dict[str, Any]:
         """
@@ -14,8 +14,11 @@ Cobertura de Pruebas:
 """
 
 import unittest
+import importlib.util
 import tempfile
+import time
 import os
+import json
 import numpy as np
 from datetime import datetime
 
@@ -24,13 +27,22 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from medical_image_manager.models.medical_image import MedicalImage
-from medical_image_manager.models.metadata import ImageMetadata
+from medical_image_manager.models.metadata import ImageMetadata, PatientInfo
 from medical_image_manager.services.image_manager import ImageManager
 from medical_image_manager.services.data_loader import DataLoader
 from medical_image_manager.utils.file_handler import FileHandler
 from medical_image_manager.utils.validators import DataValidator
 
 
+# Volumen de prueba compartido: se genera una sola vez para todo el módulo
+_RNG = np.random.default_rng(0)
+_SAMPLE_VOLUME = _RNG.standard_normal((64, 64, 32), dtype=np.float32)
+_SAMPLE_VOLUME.flags.writeable = False
+
+# Imagen inválida (sin nombre de archivo) compartida; las pruebas sólo la validan
+_INVALID_IMAGE = MedicalImage(filename="")
+
+
 class TestMedicalImage(unittest.TestCase):
     """Casos de prueba para la clase MedicalImage."""
     
@@ -38,7 +50,7 @@ class TestMedicalImage(unittest.TestCase):
         """Configurar elementos de prueba."""
         self.test_image = MedicalImage(
             filename="test_image.nii",
-            pixel_data=np.random.rand(64, 64, 32),
+            pixel_data=_SAMPLE_VOLUME,
             metadata={"modality": "MRI", "patient_id": "12345"},
             format_type="NIfTI"
         )
@@ -50,6 +62,20 @@ class TestMedicalImage(unittest.TestCase):
         self.assertEqual(self.test_image.format_type, "NIfTI")
         self.assertIsInstance(self.test_image.creation_date, datetime)
     
+    def test_unique_image_ids(self):
+        """Test generated image IDs are unique version-4 UUIDs."""
+        import uuid
+        ids = {MedicalImage(filename=f"img_{i}.nii").image_id for i in range(5000)}
+        self.assertEqual(len(ids), 5000)
+        for image_id in list(ids)[:10]:
+            self.assertEqual(uuid.UUID(image_id).version, 4)
+    
+    def test_slots(self):
+        """Test instances use fixed slots instead of a per-instance dict."""
+        self.assertFalse(hasattr(self.test_image, "__dict__"))
+        with self.assertRaises(AttributeError):
+            self.test_image.unexpected_attribute = 1
+    
     def test_metadata_operations(self):
         """Test metadata manipulation."""
         # Test getting metadata
@@ -64,6 +90,21 @@ class TestMedicalImage(unittest.TestCase):
         self.assertTrue(success)
         self.assertIsNone(self.test_image.get_metadata("patient_id"))
     
+    def test_compact_metadata(self):
+        """Test metadata survives compaction and is restored on access."""
+        self.test_image.compact_metadata()
+        self.assertEqual(self.test_image.get_metadata("modality"), "MRI")
+        
+        # Read-only access leaves the metadata compacted
+        self.assertEqual(self.test_image.metadata_view["modality"], "MRI")
+        self.assertIn("modality", self.test_image.get_image_info()["metadata_fields"])
+        self.assertFalse(self.test_image.remove_metadata("missing"))
+        self.assertIsNone(self.test_image._metadata)
+        
+        self.test_image.update_metadata("slice_thickness", 1.5)
+        self.test_image.compact_metadata()
+        self.assertEqual(self.test_image.metadata["slice_thickness"], 1.5)
+    
     def test_image_info(self):
         """Test image information retrieval."""
         info = self.test_image.get_image_info()
@@ -73,14 +114,52 @@ class TestMedicalImage(unittest.TestCase):
         self.assertIn("format_type", info)
         self.assertIn("has_pixel_data", info)
         self.assertTrue(info["has_pixel_data"])
+        
+        # Cached info is refreshed after metadata changes
+        self.test_image.update_metadata("new_field", 1)
+        info = self.test_image.get_image_info()
+        self.assertIsInstance(info["metadata_fields"], list)
+        self.assertIn("new_field", info["metadata_fields"])
+        json.dumps(info)
+        
+        # Each caller gets its own field list
+        info["metadata_fields"].clear()
+        self.assertIn("new_field", self.test_image.get_image_info()["metadata_fields"])
+        
+        view = self.test_image.metadata_view
+        self.assertEqual(view["new_field"], 1)
+        with self.assertRaises(TypeError):
+            view["new_field"] = "other"
     
     def test_validation(self):
         """Test image validation."""
         self.assertTrue(self.test_image.validate_data())
         
         # Test with invalid data
-        invalid_image = MedicalImage(filename="")
-        self.assertFalse(invalid_image.validate_data())
+        self.assertFalse(_INVALID_IMAGE.validate_data())
+        
+        # Batch validation matches per-image results
+        empty_image = MedicalImage(filename="empty.nii", pixel_data=np.array([]))
+        results = MedicalImage.validate_all([self.test_image, _INVALID_IMAGE, empty_image])
+        self.assertEqual(results.tolist(), [True, False, False])
+    
+    def test_lazy_pixel_data(self):
+        """Test pixel data is only loaded on first access."""
+        calls = []
+        
+        def loader():
+            calls.append(1)
+            return np.zeros((16, 16), dtype=np.uint8)
+        
+        lazy_image = MedicalImage(filename="lazy.nii", pixel_loader=loader)
+        self.assertFalse(lazy_image.has_pixel_data)
+        self.assertFalse(lazy_image.get_image_info()["has_pixel_data"])
+        self.assertEqual(calls, [])
+        
+        self.assertEqual(lazy_image.pixel_data.shape, (16, 16))
+        self.assertTrue(lazy_image.has_pixel_data)
+        lazy_image.pixel_data
+        self.assertEqual(len(calls), 1)
 
 
 class TestImageMetadata(unittest.TestCase):
@@ -121,6 +200,29 @@ class TestImageMetadata(unittest.TestCase):
         self.assertTrue(success)
         self.assertNotIn("custom_field", self.metadata.custom_fields)
     
+    @unittest.skipIf(sys.version_info < (3, 10), "dataclass slots require Python 3.10+")
+    def test_slots(self):
+        """Test metadata dataclasses do not carry a per-instance __dict__."""
+        self.assertFalse(hasattr(self.metadata, "__dict__"))
+        self.assertFalse(hasattr(self.metadata.patient_info, "__dict__"))
+        self.metadata.update_patient_info(patient_id="12345")
+        self.assertEqual(self.metadata.get_all_metadata()["patient_info"]["patient_id"], "12345")
+    
+    def test_search_metadata(self):
+        """Test searching nested metadata values."""
+        self.metadata.update_study_info(study_description="Chest CT")
+        self.metadata.add_custom_field("series", [{"label": "chest axial"}, {"label": "abdomen"}])
+        
+        paths = [path for path, _ in self.metadata.search_metadata("CHEST")]
+        self.assertIn("study_info.study_description", paths)
+        self.assertIn("custom_fields.series[0].label", paths)
+        self.assertNotIn("custom_fields.series[1].label", paths)
+        # Containers are not matched by their repr, and each leaf appears once
+        self.assertNotIn("custom_fields.series", paths)
+        self.assertEqual(len(paths), len(set(paths)))
+        # Unset fields are not matched through their "None" text
+        self.assertEqual(self.metadata.search_metadata("none"), [])
+    
     def test_json_serialization(self):
         """Test JSON serialization and deserialization."""
         self.metadata.update_patient_info(patient_id="12345")
@@ -129,24 +231,47 @@ class TestImageMetadata(unittest.TestCase):
         json_str = self.metadata.to_json()
         self.assertIsInstance(json_str, str)
         
+        # Callers get fresh dicts, and nested changes are always reflected
+        all_metadata = self.metadata.get_all_metadata()
+        all_metadata["patient_info"]["patient_id"] = "other"
+        all_metadata["created_at"] = None
+        self.assertEqual(self.metadata.get_all_metadata()["patient_info"]["patient_id"], "12345")
+        self.assertIsNotNone(self.metadata.get_all_metadata()["created_at"])
+        self.metadata.add_custom_field("test", "changed")
+        self.assertEqual(self.metadata.get_all_metadata()["custom_fields"]["test"], "changed")
+        self.metadata.patient_info = PatientInfo(patient_id="67890")
+        self.assertEqual(self.metadata.get_all_metadata()["patient_info"]["patient_id"], "67890")
+        self.metadata.patient_info.patient_id = "P1"
+        self.assertIn("P1", self.metadata.to_json())
+        
         loaded_metadata = ImageMetadata.from_json(json_str)
         self.assertEqual(loaded_metadata.patient_info.patient_id, "12345")
         self.assertEqual(loaded_metadata.custom_fields["test"], "value")
+        
+        # Epoch timestamps are accepted as well as ISO strings
+        epoch_metadata = ImageMetadata.from_json('{"created_at": 0, "updated_at": 0.5}')
+        self.assertEqual(epoch_metadata.created_at, datetime.fromtimestamp(0))
 
 
 class TestImageManager(unittest.TestCase):
     """Test cases for ImageManager class."""
     
+    @classmethod
+    def setUpClass(cls):
+        """Create one temporary directory for the whole class."""
+        cls._tmp = tempfile.TemporaryDirectory()
+    
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the class temporary directory."""
+        cls._tmp.cleanup()
+    
     def setUp(self):
         """Set up test fixtures."""
-        self.temp_dir = tempfile.mkdtemp()
+        self.temp_dir = os.path.join(self._tmp.name, self._testMethodName)
+        os.makedirs(self.temp_dir)
         self.image_manager = ImageManager(storage_path=self.temp_dir)
     
-    def tearDown(self):
-        """Clean up test fixtures."""
-        import shutil
-        shutil.rmtree(self.temp_dir, ignore_errors=True)
-    
     def test_manager_initialization(self):
         """Test image manager initialization."""
         self.assertIsInstance(self.image_manager.images, dict)
@@ -167,6 +292,263 @@ class TestImageManager(unittest.TestCase):
         stats = self.image_manager.get_statistics()
         self.assertEqual(stats["total_images"], 1)
         self.assertIn("NIfTI", stats["formats"])
+        
+        other = MedicalImage(filename="b.nii", format_type="NIfTI", file_size=10)
+        self.image_manager.images[other.image_id] = other
+        stats = self.image_manager.get_statistics()
+        self.assertEqual(stats["formats"], {"NIfTI": 2})
+        self.assertEqual(stats["total_file_size_bytes"], 10)
+        self.assertIs(type(stats["total_file_size_bytes"]), int)
+    
+    def test_list_images(self):
+        """Test listing images with format filter and sorting."""
+        specs = [("b.nii", "NIfTI", 300), ("a.dcm", "DICOM", None), ("c.nii", "NIfTI", 100)]
+        for filename, format_type, file_size in specs:
+            image = MedicalImage(filename=filename, format_type=format_type, file_size=file_size)
+            self.image_manager.images[image.image_id] = image
+        
+        by_name = self.image_manager.list_images(sort_by="filename")
+        self.assertEqual([img.filename for img in by_name], ["a.dcm", "b.nii", "c.nii"])
+        
+        by_size = self.image_manager.list_images(sort_by="file_size")
+        self.assertEqual([img.filename for img in by_size], ["a.dcm", "c.nii", "b.nii"])
+        
+        nifti = self.image_manager.list_images(format_filter="NIfTI", sort_by="filename")
+        self.assertEqual([img.filename for img in nifti], ["b.nii", "c.nii"])
+        self.assertEqual(self.image_manager.list_images(format_filter="PNG"), [])
+        
+        # The memoized order follows newly added images
+        image = MedicalImage(filename="0.png", format_type="PNG", file_size=200)
+        self.image_manager.images[image.image_id] = image
+        by_name = self.image_manager.list_images(sort_by="filename")
+        self.assertEqual(
+            [img.filename for img in by_name], ["0.png", "a.dcm", "b.nii", "c.nii"]
+        )
+        
+        # Swapping one image for another (same count) is seen as well
+        del self.image_manager.images[image.image_id]
+        image = MedicalImage(filename="d.png", format_type="PNG")
+        self.image_manager.images[image.image_id] = image
+        by_name = self.image_manager.list_images(sort_by="filename")
+        self.assertEqual(
+            [img.filename for img in by_name], ["a.dcm", "b.nii", "c.nii", "d.png"]
+        )
+        
+        # Metadata changes made on the image itself re-sort by last_modified
+        time.sleep(0.002)
+        by_name[0].update_metadata("note", "reviewed")
+        by_modified = self.image_manager.list_images(sort_by="last_modified")
+        self.assertEqual(by_modified[-1].filename, "a.dcm")
+    
+    def test_search_images(self):
+        """Test searching images by filename and metadata substrings."""
+        brain = MedicalImage(
+            filename="brain_t1.nii",
+            metadata={"modality": "MRI", "body_part": "Brain"},
+            format_type="NIfTI"
+        )
+        chest = MedicalImage(
+            filename="chest.dcm",
+            metadata={"modality": "CT"},
+            format_type="DICOM"
+        )
+        self.image_manager.images[brain.image_id] = brain
+        self.image_manager.images[chest.image_id] = chest
+        
+        self.assertEqual(self.image_manager.search_images("RAI"), [brain])
+        self.assertEqual(self.image_manager.search_images("ct"), [chest])
+        self.assertEqual(self.image_manager.search_images("chest"), [chest])
+        self.assertEqual(self.image_manager.search_images("ultrasound"), [])
+        
+        # Field-restricted searches, and no matches across value boundaries
+        self.assertEqual(self.image_manager.search_images("mri", ["modality"]), [brain])
+        self.assertEqual(self.image_manager.search_images("mri", ["body_part"]), [])
+        self.assertEqual(self.image_manager.search_images("mribrain"), [])
+        
+        # Short queries are answered from the index keys as well
+        self.assertEqual(self.image_manager.search_images("."), [brain, chest])
+        self.assertEqual(self.image_manager.search_images("1."), [brain])
+        self.assertEqual(self.image_manager.search_images("q"), [])
+        self.assertEqual(self.image_manager.search_images(""), [brain, chest])
+        
+        # Index stays in sync with metadata updates and deletions
+        self.image_manager.update_image_metadata(chest.image_id, {"note": "ultrasound"})
+        self.assertEqual(self.image_manager.search_images("ultrasound"), [chest])
+        self.assertEqual(self.image_manager.search_images("sound", ["note"]), [chest])
+        self.image_manager.remove_image_metadata(chest.image_id, "note")
+        self.assertEqual(self.image_manager.search_images("ultrasound"), [])
+        self.assertEqual(self.image_manager.search_images("sound", ["note"]), [])
+        self.assertNotIn("note", self.image_manager._field_index)
+        
+        # Changes made on an image returned by get_image are indexed too
+        self.image_manager.get_image(chest.image_id).update_metadata("modality", "PET")
+        self.assertEqual(self.image_manager.search_images("pet"), [chest])
+        self.assertEqual(self.image_manager.search_images("ct", ["modality"]), [])
+        self.image_manager.delete_image(brain.image_id)
+        self.assertEqual(self.image_manager.search_images("brain"), [])
+    
+    def test_delete_images(self):
+        """Test bulk deletion removes images and their metadata files."""
+        images = [MedicalImage(filename=f"{i}.nii", format_type="NIfTI") for i in range(3)]
+        for image in images:
+            self.image_manager.images[image.image_id] = image
+            self.image_manager._save_image_metadata(image)
+        image_ids = [image.image_id for image in images]
+        
+        deleted = self.image_manager.delete_images(image_ids[:2] + ["missing"])
+        self.assertEqual(deleted, 2)
+        self.assertEqual(list(self.image_manager.images), image_ids[2:])
+        self.assertEqual(
+            sorted(os.listdir(self.image_manager.storage_path)),
+            [f"{image_ids[2]}_metadata.json"]
+        )
+        self.assertEqual(self.image_manager.delete_images([]), 0)
+    
+    def test_reload_metadata_files(self):
+        """Test a new manager loads every valid metadata file and skips broken ones."""
+        images = [MedicalImage(filename=f"{i}.nii", format_type="NIfTI") for i in range(3)]
+        for image in images:
+            self.image_manager._save_image_metadata(image)
+        with open(os.path.join(self.temp_dir, "broken_metadata.json"), 'w') as f:
+            f.write("{")
+        
+        reloaded = ImageManager(storage_path=self.temp_dir)
+        self.assertEqual(
+            sorted(reloaded.images), sorted(image.image_id for image in images)
+        )
+        self.assertEqual(len(reloaded.search_images("1.nii")), 1)
+    
+    def test_export_metadata_json(self):
+        """Test the JSON export round-trips through json.load."""
+        images = [
+            MedicalImage(filename=f"{i}.nii", format_type="NIfTI", metadata={"modality": "MR"})
+            for i in range(2)
+        ]
+        for image in images:
+            self.image_manager.images[image.image_id] = image
+        
+        output_file = os.path.join(self.temp_dir, "export.json")
+        for image in images:
+            image.compact_metadata()
+        self.assertTrue(self.image_manager.export_metadata(output_file, "json"))
+        self.assertTrue(all(image._metadata is None for image in images))
+        with open(output_file) as f:
+            exported = json.load(f)
+        self.assertEqual(exported, [
+            {
+                "image_id": image.image_id,
+                "filename": image.filename,
+                "format_type": "NIfTI",
+                "creation_date": image.creation_date.isoformat(),
+                "metadata": {"modality": "MR"}
+            }
+            for image in images
+        ])
+        
+        # An empty registry exports an empty array
+        self.image_manager.images.clear()
+        self.assertTrue(self.image_manager.export_metadata(output_file, "json"))
+        with open(output_file) as f:
+            self.assertEqual(json.load(f), [])
+    
+    def test_register_int64_nifti(self):
+        """Test volumes with a non-allowed dtype (int64 label masks) still register."""
+        try:
+            import nibabel as nib
+        except ImportError:
+            self.skipTest("nibabel not available")
+        
+        test_file = os.path.join(self.temp_dir, "labels.nii")
+        labels = np.arange(512, dtype=np.int64).reshape(8, 8, 8) % 4
+        nib.save(nib.Nifti1Image(labels, np.eye(4), dtype=np.int64), test_file)
+        
+        image_id = self.image_manager.register_image(test_file)
+        pixel_data = self.image_manager.get_image(image_id).pixel_data
+        self.assertEqual(pixel_data.dtype, np.float64)
+        np.testing.assert_array_equal(pixel_data, labels)
+    
+    def test_register_deduplication(self):
+        """Test unchanged files register once, also when registered concurrently."""
+        try:
+            import nibabel as nib
+        except ImportError:
+            self.skipTest("nibabel not available")
+        
+        test_file = os.path.join(self.temp_dir, "volume.nii")
+        nib.save(nib.Nifti1Image(np.ones((8, 8, 8), dtype=np.int16), np.eye(4)), test_file)
+        
+        # Slow reads make the concurrent registrations overlap
+        load_image = self.image_manager.file_handler.load_image
+        
+        def slow_load_image(*args, **kwargs):
+            time.sleep(0.01)
+            return load_image(*args, **kwargs)
+        
+        self.image_manager.file_handler.load_image = slow_load_image
+        results = list(self.image_manager.register_images([test_file] * 8, max_workers=8))
+        image_ids = {image_id for _, image_id, _ in results}
+        self.assertEqual(len(image_ids), 1)
+        self.assertEqual(len(self.image_manager), 1)
+        image_id = image_ids.pop()
+        
+        # Modified or deleted images are no longer returned for the file
+        self.image_manager.update_image_metadata(image_id, {"note": "edited"})
+        edited_copy = self.image_manager.register_image(test_file)
+        self.assertNotEqual(edited_copy, image_id)
+        self.image_manager.delete_images([image_id, edited_copy])
+        self.assertEqual(self.image_manager._by_stat, {})
+        self.assertNotIn(self.image_manager.register_image(test_file), (image_id, edited_copy))
+    
+    @unittest.skipUnless(
+        importlib.util.find_spec("cv2"), "opencv-python not available for image registration"
+    )
+    def test_database_store(self):
+        """Test the optional SQLite catalog persists and searches images."""
+        test_file = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            "data", "test", "TestImage.jpg"
+        )
+        
+        db_dir = os.path.join(self.temp_dir, "db")
+        manager = ImageManager(storage_path=db_dir, use_database=True)
+        image_id = manager.register_image(test_file, load_pixel_data=False)
+        
+        # Re-registering the unchanged file returns the existing image
+        self.assertEqual(manager.register_image(test_file, load_pixel_data=False), image_id)
+        self.assertEqual(len(manager), 1)
+        self.assertFalse(
+            [name for name in os.listdir(db_dir) if name.endswith("_metadata.json")]
+        )
+        self.assertEqual([img.image_id for img in manager.search_images("testimage")], [image_id])
+        
+        # Short queries fall back to a scan, pre-filtered by each image's characters
+        self.assertEqual([img.image_id for img in manager.search_images("JP")], [image_id])
+        self.assertEqual(manager.search_images("zq"), [])
+        
+        # Bulk registration reports per-file results, including failures
+        results = {
+            path: (registered_id, error)
+            for path, registered_id, error in manager.register_images(
+                [test_file, os.path.join(self.temp_dir, "missing.jpg")]
+            )
+        }
+        self.assertEqual(results[test_file], (image_id, None))
+        self.assertIsInstance(results[os.path.join(self.temp_dir, "missing.jpg")][1], FileNotFoundError)
+        
+        # A new manager loads the registry back from the catalog
+        reloaded = ImageManager(storage_path=db_dir, use_database=True)
+        self.assertIn(image_id, reloaded)
+        self.assertEqual(len(reloaded.search_images("TestImage")), 1)
+        
+        # Unsaved changes on the image are found before the catalog is updated
+        reloaded.get_image(image_id).update_metadata("note", "follow-up")
+        self.assertEqual([img.image_id for img in reloaded.search_images("follow")], [image_id])
+        
+        reloaded.delete_image(image_id)
+        self.assertEqual(reloaded.store.count(), 0)
+        self.assertEqual(reloaded.search_images("testimage"), [])
+        manager.store.close()
+        reloaded.store.close()
 
 
 class TestDataValidator(unittest.TestCase):
@@ -179,7 +561,7 @@ class TestDataValidator(unittest.TestCase):
     def test_pixel_data_validation(self):
         """Test pixel data validation."""
         # Valid data
-        valid_data = np.random.rand(64, 64, 32).astype(np.float32)
+        valid_data = _SAMPLE_VOLUME
         self.assertTrue(self.validator.validate_pixel_data(valid_data))
         
         # Invalid data
@@ -189,20 +571,179 @@ class TestDataValidator(unittest.TestCase):
         # Data with NaN values
         nan_data = np.full((10, 10), np.nan)
         self.assertFalse(self.validator.validate_pixel_data(nan_data))
+        
+        # Data with infinite values, reported separately from NaN
+        inf_data = np.zeros((16, 16), dtype=np.float32)
+        inf_data[0, 0] = np.inf
+        self.assertEqual(
+            self.validator._validate_pixel_data(inf_data),
+            ["Pixel data contains infinite values"]
+        )
+        
+        # Integer data skips the finite check
+        self.assertTrue(self.validator.validate_pixel_data(np.ones((16, 16), dtype=np.int16)))
+        
+        # Allowed types ignore byte order and follow rule updates
+        self.assertTrue(self.validator.validate_pixel_data(np.ones((16, 16), dtype='>i2')))
+        self.validator.set_validation_rule("allowed_dtypes", [np.uint8])
+        self.assertFalse(self.validator.validate_pixel_data(valid_data))
+        
+        # Abstract types cover their whole branch of the dtype hierarchy
+        self.validator.set_validation_rule("allowed_dtypes", [np.floating])
+        self.assertTrue(self.validator.validate_pixel_data(np.ones((16, 16), dtype=np.float16)))
+        self.assertFalse(self.validator.validate_pixel_data(np.ones((16, 16), dtype=np.int16)))
+    
+    def test_metadata_rules(self):
+        """Test required fields and string length limits on metadata."""
+        self.validator.set_validation_rule("required_metadata_fields", ["modality", "patient_id"])
+        self.validator.set_validation_rule("max_metadata_string_length", 4)
+        self.assertEqual(
+            self.validator._validate_metadata({"modality": "CT", "note": "too long"}),
+            [
+                "Required metadata field missing: patient_id",
+                "Metadata field 'note' exceeds maximum length: 8"
+            ]
+        )
+        self.assertEqual(
+            self.validator._validate_metadata({"modality": "CT", "patient_id": 7}), []
+        )
+    
+    def test_file_format_validation(self):
+        """Test file format validation by extension."""
+        self.assertTrue(self.validator.validate_file_format("scan.NII.GZ", "NIfTI"))
+        self.assertTrue(self.validator.validate_file_format("slice.dcm", "DICOM"))
+        self.assertTrue(self.validator.validate_file_format(".dcm", "DICOM"))
+        self.assertFalse(self.validator.validate_file_format("slice.dcm", "NIfTI"))
+        self.assertFalse(self.validator.validate_file_format("archive.gz", "NIfTI"))
+        self.assertFalse(self.validator.validate_file_format("slice.dcm", "BMP"))
+    
+    def test_dicom_compliance(self):
+        """Test required DICOM tags are found by keyword or by containing key."""
+        metadata = {
+            "(0008, 0018)_SOPInstanceUID": "1.2.3",
+            "dicom_studyinstanceuid": "1.2",
+            "dicom_SeriesInstanceUID": "1.2.4",
+            "Modality": "CT"
+        }
+        self.assertEqual(self.validator.validate_dicom_compliance(metadata), [])
+        del metadata["dicom_SeriesInstanceUID"]
+        self.assertEqual(
+            self.validator.validate_dicom_compliance(metadata),
+            ["Missing required DICOM tag: SeriesInstanceUID"]
+        )
+        
+        # A tag split across two keys is not a match
+        self.assertIn(
+            "Missing required DICOM tag: SOPInstanceUID",
+            self.validator.validate_dicom_compliance({"SOPInstance": 1, "UID": 2})
+        )
+    
+    def test_validate_batch(self):
+        """Test batch validation rejects bad structure and checks the rest fully."""
+        images = [
+            MedicalImage(filename="ok.nii", pixel_data=_SAMPLE_VOLUME),
+            MedicalImage(filename="small.png", pixel_data=np.zeros((4, 4), dtype=np.uint8)),
+            MedicalImage(filename="flat.png", pixel_data=np.zeros(64, dtype=np.uint8)),
+            MedicalImage(filename="bool.png", pixel_data=np.zeros((8, 8), dtype=bool)),
+            MedicalImage(filename="nan.nii", pixel_data=np.full((8, 8), np.nan)),
+            MedicalImage(filename="header_only.nii")
+        ]
+        self.assertEqual(
+            self.validator.validate_batch(images),
+            [True, False, False, False, False, True]
+        )
+        self.assertEqual(
+            self.validator.validate_batch(images),
+            [self.validator.validate_image(image) for image in images]
+        )
+    
+    def test_image_consistency(self):
+        """Test dimension and modality consistency across images."""
+        images = [
+            MedicalImage(filename=name, pixel_data=np.zeros(shape, dtype=np.uint8))
+            for name, shape in [("a.png", (8, 8)), ("b.png", (8, 8)), ("c.png", (8, 16))]
+        ]
+        self.assertEqual(
+            self.validator.validate_image_consistency(images[:2], check_modality=False), []
+        )
+        self.assertEqual(
+            self.validator.validate_image_consistency(images, check_modality=False),
+            ["Inconsistent dimensions: c.png has shape (8, 16), expected (8, 8)"]
+        )
+        
+        # Modality keys are matched case-insensitively
+        ct = MedicalImage(filename="ct.dcm", metadata={"Modality": "CT"})
+        mr = MedicalImage(filename="mr.dcm", metadata={"series_modality": "MR"})
+        self.assertEqual(self.validator.validate_image_consistency([ct, ct]), [])
+        issues = self.validator.validate_image_consistency([ct, mr])
+        self.assertEqual(len(issues), 1)
+        self.assertIn("Inconsistent modalities", issues[0])
+        self.assertEqual(
+            self.validator.validate_dicom_compliance({"Modality": "XX"})[-1],
+            "Invalid DICOM modality: XX"
+        )
+    
+    def test_pixel_result_cache(self):
+        """Test opt-in memoization of pixel-data validation."""
+        validator = DataValidator(enable_result_cache=True)
+        data = np.zeros((16, 16), dtype=np.float32)
+        self.assertTrue(validator.validate_pixel_data(data))
+        
+        # In-place changes are not seen until the cache is invalidated
+        data[0, 0] = np.nan
+        self.assertTrue(validator.validate_pixel_data(data))
+        validator.invalidate_cache()
+        self.assertFalse(validator.validate_pixel_data(data))
+        
+        # Views with another shape are validated separately
+        self.assertFalse(validator.validate_pixel_data(data.reshape(8, 32)))
+        self.assertFalse(self.validator.enable_result_cache)
+    
+    def test_compile_specialized(self):
+        """Test specialized pixel-data validators."""
+        validator = DataValidator()
+        ct_check = validator.compile_specialized(np.uint16, 3)
+        self.assertIs(validator.compile_specialized(np.dtype('>u2'), 3), ct_check)
+        
+        volume = np.zeros((16, 16, 8), dtype=np.uint16)
+        self.assertEqual(ct_check(volume), [])
+        self.assertTrue(validator.validate_pixel_data(volume))
+        self.assertFalse(validator.validate_pixel_data(np.zeros((4, 16, 8), dtype=np.uint16)))
+        
+        float_check = validator.compile_specialized(np.float32, 2)
+        slice_data = np.zeros((16, 16), dtype=np.float32)
+        slice_data[0, 0] = np.inf
+        self.assertEqual(float_check(slice_data), ["Pixel data contains infinite values"])
+        
+        with self.assertRaises(ValueError):
+            validator.compile_specialized(np.uint64, 3)
+        with self.assertRaises(ValueError):
+            validator.compile_specialized(np.uint16, 5)
+        
+        # Rule changes drop the compiled validators
+        validator.set_validation_rule("min_image_dimensions", [1, 1])
+        self.assertTrue(validator.validate_pixel_data(np.zeros((4, 16, 8), dtype=np.uint16)))
     
     def test_image_validation(self):
         """Test medical image validation."""
         # Valid image
         valid_image = MedicalImage(
             filename="test.nii",
-            pixel_data=np.random.rand(64, 64, 32),
+            pixel_data=_SAMPLE_VOLUME,
             format_type="NIfTI"
         )
         self.assertTrue(self.validator.validate_image(valid_image))
         
         # Invalid image (no filename)
-        invalid_image = MedicalImage(filename="")
-        self.assertFalse(self.validator.validate_image(invalid_image))
+        self.assertFalse(self.validator.validate_image(_INVALID_IMAGE))
+        
+        # The diagnostic path still reports every failing check
+        nan_image = MedicalImage(filename="", pixel_data=np.full((16, 16), np.nan))
+        self.assertFalse(self.validator.validate_image(nan_image))
+        self.assertEqual(
+            self.validator.get_validation_errors(nan_image),
+            ["Filename is required", "Pixel data contains NaN values"]
+        )
     
     def test_validation_rules(self):
         """Test validation rule management."""
@@ -221,16 +762,22 @@ class TestDataValidator(unittest.TestCase):
 class TestDataLoader(unittest.TestCase):
     """Test cases for DataLoader class."""
     
+    @classmethod
+    def setUpClass(cls):
+        """Create one temporary directory for the whole class."""
+        cls._tmp = tempfile.TemporaryDirectory()
+    
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the class temporary directory."""
+        cls._tmp.cleanup()
+    
     def setUp(self):
         """Set up test fixtures."""
-        self.temp_dir = tempfile.mkdtemp()
+        self.temp_dir = os.path.join(self._tmp.name, self._testMethodName)
+        os.makedirs(self.temp_dir)
         self.data_loader = DataLoader(download_dir=self.temp_dir)
     
-    def tearDown(self):
-        """Clean up test fixtures."""
-        import shutil
-        shutil.rmtree(self.temp_dir, ignore_errors=True)
-    
     def test_initialization(self):
         """Test data loader initialization."""
         self.assertTrue(os.path.exists(self.temp_dir))
@@ -272,15 +819,21 @@ class TestDataLoader(unittest.TestCase):
 class TestFileHandler(unittest.TestCase):
     """Test cases for FileHandler class."""
     
+    @classmethod
+    def setUpClass(cls):
+        """Create one temporary directory for the whole class."""
+        cls._tmp = tempfile.TemporaryDirectory()
+    
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the class temporary directory."""
+        cls._tmp.cleanup()
+    
     def setUp(self):
         """Set up test fixtures."""
         self.file_handler = FileHandler()
-        self.temp_dir = tempfile.mkdtemp()
-    
-    def tearDown(self):
-        """Clean up test fixtures."""
-        import shutil
-        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        self.temp_dir = os.path.join(self._tmp.name, self._testMethodName)
+        os.makedirs(self.temp_dir)
     
     def test_format_detection(self):
         """Test file format detection."""
@@ -289,6 +842,8 @@ class TestFileHandler(unittest.TestCase):
             ("test.nii.gz", "NIfTI"),
             ("test.dcm", "DICOM"),
             ("test.png", "PNG"),
+            (".dcm", "DICOM"),
+            (os.path.join("scans", ".png"), "PNG"),
             ("unknown.xyz", "Unknown")
         ]
         
@@ -309,6 +864,62 @@ class TestFileHandler(unittest.TestCase):
         self.assertEqual(file_info["format_type"], "NIfTI")
         self.assertGreater(file_info["file_size"], 0)
     
+    def test_load_cache(self):
+        """Test header loads are cached as private copies and pixels are not."""
+        try:
+            import cv2
+        except ImportError:
+            self.skipTest("opencv-python not available")
+        
+        test_file = os.path.join(self.temp_dir, "test.png")
+        cv2.imwrite(test_file, np.full((16, 16), 7, dtype=np.uint8))
+        
+        first, metadata, _ = self.file_handler.load_image(test_file)
+        first[:] = 0
+        metadata["file_size"] = -1
+        
+        second, metadata, format_type = self.file_handler.load_image(test_file)
+        self.assertEqual(format_type, "PNG")
+        self.assertTrue(np.all(second == 7))
+        self.assertGreater(metadata["file_size"], 0)
+        self.assertEqual(len(self.file_handler._load_cache), 0)
+        
+        _, metadata, _ = self.file_handler.load_image(test_file, load_pixel_data=False)
+        metadata["file_size"] = -1
+        pixel_data, metadata, _ = self.file_handler.load_image(test_file, load_pixel_data=False)
+        self.assertIsNone(pixel_data)
+        self.assertGreater(metadata["file_size"], 0)
+        self.assertEqual(len(self.file_handler._load_cache), 1)
+    
+    def test_load_nifti_native_dtype(self):
+        """Test NIfTI header metadata and memory-mapped native-dtype pixels."""
+        try:
+            import nibabel as nib
+        except ImportError:
+            self.skipTest("nibabel not available")
+        
+        test_file = os.path.join(self.temp_dir, "test.nii")
+        volume = np.arange(24, dtype=np.int16).reshape(2, 3, 4)
+        nib.save(nib.Nifti1Image(volume, np.eye(4)), test_file)
+        
+        pixel_data, metadata, format_type = self.file_handler.load_image(test_file)
+        self.assertEqual(format_type, "NIfTI")
+        self.assertEqual(metadata["nifti_dim"], [3, 2, 3, 4, 1, 1, 1, 1])
+        self.assertEqual(metadata["nifti_sizeof_hdr"], 348)
+        self.assertIsInstance(pixel_data, np.memmap)
+        self.assertEqual(pixel_data.dtype, np.int16)
+        np.testing.assert_array_equal(pixel_data, volume)
+        self.assertEqual(len(self.file_handler._load_cache), 0)
+        
+        # Cached headers do not share nested metadata values
+        _, metadata, _ = self.file_handler.load_image(test_file, load_pixel_data=False)
+        metadata["nifti_dim"].append(0)
+        metadata["nifti_affine"][0][0] = -1.0
+        _, metadata, _ = self.file_handler.load_image(test_file, load_pixel_data=False)
+        self.assertEqual(metadata["nifti_dim"], [3, 2, 3, 4, 1, 1, 1, 1])
+        self.assertEqual(metadata["nifti_affine"][0][0], 1.0)
+        self.assertEqual(len(self.file_handler._load_cache), 1)
+    
     def test_file_validation(self):
         """Test file validation."""
         # Non-existent file